@@ -6,6 +6,7 @@ from services.ocr_service import OCRService
 from services.llm_service import LLMService
 from services.certificate_service import CertificateService
 from services.prompt_service import PromptService
+from services.cache_service import CacheService
 from services.activity_categorization_service import ActivityCategorizationService
 from services.s3_service import S3Service
 from services.kafka_service import KafkaService
@@ -28,6 +29,12 @@ class ServiceModule(Module):
         """Provide prompt service instance."""
         return PromptService()
     
+    @singleton
+    @provider
+    def provide_cache_service(self) -> CacheService:
+        """Provide cache service instance."""
+        return CacheService()
+    
     @singleton
     @provider
     def provide_ocr_service(self) -> OCRService:
@@ -59,16 +66,14 @@ class ServiceModule(Module):
         s3_service: S3Service,
         kafka_service: KafkaService,
         student_service: StudentService,
-        submission_repository: CertificateSubmissionRepository,
-        activity_category_repository: ActivityCategoryRepository
+        submission_repository: CertificateSubmissionRepository
     ) -> CertificateSubmissionService:
         """Provide certificate submission service instance."""
         return CertificateSubmissionService(
             s3_service, 
             kafka_service, 
             student_service, 
-            submission_repository,
-            activity_category_repository
+            submission_repository
         )
     
     @singleton
@@ -85,9 +90,9 @@ class ServiceModule(Module):
     
     @singleton
     @provider
-    def provide_llm_service(self, prompt_service: PromptService) -> LLMService:
-        """Provide LLM service instance with prompt service injected."""
-        return LLMService(prompt_service)
+    def provide_llm_service(self, prompt_service: PromptService, cache_service: CacheService) -> LLMService:
+        """Provide LLM service instance with prompt and cache services injected."""
+        return LLMService(prompt_service, cache_service)
     
     @singleton
     @provider
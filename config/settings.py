@@ -11,20 +11,65 @@ load_dotenv()
 DEBUG = os.getenv('DEBUG', 'False').lower() == 'true'
 HOST = os.getenv('HOST', '0.0.0.0')
 PORT = int(os.getenv('PORT', 5000))
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()  # WARNING skips the per-document progress logs
 MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
+# Uploads handled at once per worker process; below the gunicorn thread count, so excess uploads get a 429
+MAX_CONCURRENT_SUBMISSIONS = int(os.getenv('MAX_CONCURRENT_SUBMISSIONS', max(1, int(os.getenv('GUNICORN_THREADS', 8)) // 2)))
+SUBMISSION_QUEUE_TIMEOUT = float(os.getenv('SUBMISSION_QUEUE_TIMEOUT', 5))  # Seconds an upload waits for a slot before 429
 
 # File upload settings
 ALLOWED_EXTENSIONS = {'pdf', 'png', 'jpg', 'jpeg', 'tiff', 'bmp'}
 
 # OCR settings
-TESSERACT_CONFIG = r'--oem 3 --psm 6 -l por+eng'
+TESSERACT_LANG = os.getenv('TESSERACT_LANG', 'por+eng')
+TESSERACT_OEM = int(os.getenv('TESSERACT_OEM', 3))
+TESSERACT_PSM = int(os.getenv('TESSERACT_PSM', 6))
+TESSERACT_CONFIG = f'--oem {TESSERACT_OEM} --psm {TESSERACT_PSM} -l {TESSERACT_LANG}'
+OCR_ENGINE = os.getenv('OCR_ENGINE', 'tesserocr')  # tesserocr (in-process, if installed) or pytesseract
+OCR_MAX_WORKERS = int(os.getenv('OCR_MAX_WORKERS', os.cpu_count() or 1))  # Pages OCRed in parallel
+OCR_MAX_IMAGE_SIDE = int(os.getenv('OCR_MAX_IMAGE_SIDE', 1600))  # Longest side in pixels before OCR
+OCR_BINARIZE_THRESHOLD = int(os.getenv('OCR_BINARIZE_THRESHOLD', 0))  # Grayscale values below become black, 0 picks one per image (Otsu)
+OCR_DENOISE = os.getenv('OCR_DENOISE', 'False').lower() == 'true'  # Median filter speckle noise before binarizing
+OCR_DESKEW = os.getenv('OCR_DESKEW', 'False').lower() == 'true'  # Straighten slightly rotated scans before binarizing
+OCR_FALLBACK_MIN_WORDS = int(os.getenv('OCR_FALLBACK_MIN_WORDS', 3))  # Re-OCR the plain grayscale page when preprocessing yields fewer words
+PDF_DPI = int(os.getenv('PDF_DPI', 200))  # Rasterization resolution for PDF pages
+OCR_EARLY_STOP_WORDS = int(os.getenv('OCR_EARLY_STOP_WORDS', 0))  # Stop OCR of a PDF once leading pages give this many words of certificate text, 0 OCRs every page
+CERTIFICATE_MIN_EVIDENCE = int(os.getenv('CERTIFICATE_MIN_EVIDENCE', 2))  # Certificate keywords/dates/hours OCR text needs to reach the LLM, 0 disables
+PDF_RENDER_THREADS = int(os.getenv('PDF_RENDER_THREADS', os.cpu_count() or 1))  # pdftoppm processes rasterizing pages in parallel
+NAME_MATCH_MIN_SCORE = int(os.getenv('NAME_MATCH_MIN_SCORE', 85))  # rapidfuzz token set ratio (0-100) a certificate name needs to match the student
 
 # Ollama LLM settings
 OLLAMA_BASE_URL = os.getenv('OLLAMA_BASE_URL', 'http://localhost:11434')
-OLLAMA_MODEL = os.getenv('OLLAMA_MODEL', 'llama3.2:3b')
-OLLAMA_TIMEOUT = int(os.getenv('OLLAMA_TIMEOUT', 300))  # Increased to 5 minutes
+OLLAMA_MODEL = os.getenv('OLLAMA_MODEL', 'llama3.2:3b-instruct-q4_K_M')
+LLM_BACKEND = os.getenv('LLM_BACKEND', 'ollama')  # 'ollama', or 'openai' for OpenAI-compatible servers (vLLM, llama.cpp server)
+LLM_BACKEND_URL = os.getenv('LLM_BACKEND_URL', OLLAMA_BASE_URL)  # Base URL of the LLM server, without /v1
+LLM_API_KEY = os.getenv('LLM_API_KEY', '')  # Bearer token for OpenAI-compatible servers, empty sends none
+OLLAMA_TIMEOUT = int(os.getenv('OLLAMA_TIMEOUT', 60))  # Seconds without streamed output before a request is abandoned
+OLLAMA_MAX_GENERATION_TIME = int(os.getenv('OLLAMA_MAX_GENERATION_TIME', 120))  # Seconds a single generation may stream in total
 OLLAMA_CONNECTION_TIMEOUT = int(os.getenv('OLLAMA_CONNECTION_TIMEOUT', 10))  # Increased connection timeout
 MODEL_DOWNLOAD_TIMEOUT = int(os.getenv('MODEL_DOWNLOAD_TIMEOUT', 600))  # Increased to 10 minutes
+OLLAMA_STATUS_TTL = int(os.getenv('OLLAMA_STATUS_TTL', 30))  # Seconds an Ollama availability check is reused
+OLLAMA_POOL_MAXSIZE = int(os.getenv('OLLAMA_POOL_MAXSIZE', 8))  # Keep-alive connections kept per host
+OLLAMA_NUM_CTX = int(os.getenv('OLLAMA_NUM_CTX', 2048))  # Context window per certificate (system prompt + truncated OCR text), times LLM_BATCH_SIZE
+OLLAMA_NUM_PREDICT = int(os.getenv('OLLAMA_NUM_PREDICT', 256))  # Upper bound of tokens generated per response
+OLLAMA_NUM_THREAD = int(os.getenv('OLLAMA_NUM_THREAD', max(1, (os.cpu_count() or 2) // 2)))  # Generation threads, one per physical core
+OLLAMA_KEEP_ALIVE = os.getenv('OLLAMA_KEEP_ALIVE', '30m')  # How long Ollama keeps the model and its prompt prefix cache loaded
+LLM_COMBINED_CATEGORIZATION = os.getenv('LLM_COMBINED_CATEGORIZATION', 'False').lower() == 'true'  # Extract fields and categorize in one LLM request
+KEYWORD_CATEGORIZATION = os.getenv('KEYWORD_CATEGORIZATION', 'False').lower() == 'true'  # Categorize programs named in the event title without the LLM
+LLM_SCHEMA_RETRIES = int(os.getenv('LLM_SCHEMA_RETRIES', 2))  # Extra attempts when a reply is not a JSON object with every field
+LLM_RETRY_BACKOFF = float(os.getenv('LLM_RETRY_BACKOFF', 0.5))  # Seconds, multiplied by the attempt number, between attempts
+LLM_TRANSIENT_RETRIES = int(os.getenv('LLM_TRANSIENT_RETRIES', 2))  # Extra attempts after rate limits, 502-504 or refused connections
+LLM_TRANSIENT_BACKOFF = float(os.getenv('LLM_TRANSIENT_BACKOFF', 1.0))  # Seconds before the first retry, doubled each attempt, with jitter
+LLM_TRANSIENT_MAX_BACKOFF = float(os.getenv('LLM_TRANSIENT_MAX_BACKOFF', 30.0))  # Longest wait between attempts
+LLM_BATCH_SIZE = int(os.getenv('LLM_BATCH_SIZE', 1))  # Certificates extracted per Ollama request, 1 disables batching
+LLM_PARALLEL_REQUESTS = int(os.getenv('LLM_PARALLEL_REQUESTS', 1))  # Concurrent requests per batch, match Ollama's OLLAMA_NUM_PARALLEL
+LLM_MAX_INPUT_WORDS = int(os.getenv('LLM_MAX_INPUT_WORDS', 400))  # OCR words sent for extraction, 0 sends all
+LLM_RELEVANT_LINES = int(os.getenv('LLM_RELEVANT_LINES', 40))  # OCR lines kept for extraction, by certificate wording, 0 keeps all
+LLM_PREFILTER_MIN_CHARS = int(os.getenv('LLM_PREFILTER_MIN_CHARS', 1500))  # Shorter OCR texts are sent without line selection
+LLM_CACHE_SIZE = int(os.getenv('LLM_CACHE_SIZE', 512))  # Cached extraction results per process, 0 disables
+LLM_CACHE_DIR = os.getenv('LLM_CACHE_DIR')  # Directory persisting cached results across restarts, unset disables
+OLLAMA_EMBEDDING_MODEL = os.getenv('OLLAMA_EMBEDDING_MODEL', '')  # Embeds OCR text to reuse results of near-duplicates, empty disables
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv('SEMANTIC_CACHE_THRESHOLD', 0.97))  # Cosine similarity needed to reuse a result
 
 # Image processing settings
 CONTRAST_FACTOR = float(os.getenv('CONTRAST_FACTOR', 1.5))
@@ -37,9 +82,31 @@ DB_PORT = int(os.getenv('DB_PORT', 5432))
 DB_NAME = os.getenv('DB_NAME', 'complementa_db')
 DB_USER = os.getenv('DB_USER', 'complementa_user')
 DB_PASSWORD = os.getenv('DB_PASSWORD', 'complementa_pass')
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 20))  # Connections kept open per process (API threads, consumer workers)
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 10))  # Extra connections opened under bursts, closed when returned
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 300))  # Seconds before a pooled connection is replaced
+DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', 10))  # Seconds to wait for a free pooled connection before failing
+DB_NULL_POOL = os.getenv('DB_NULL_POOL', 'False').lower() == 'true'  # Open a connection per session instead of pooling (e.g. behind PgBouncer)
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', 30000))  # Server-side limit per statement, 0 disables it
 
 # Kafka settings
 KAFKA_BOOTSTRAP_SERVERS = os.getenv('KAFKA_BOOTSTRAP_SERVERS', 'localhost:9092').split(',')
+KAFKA_POLL_TIMEOUT_MS = int(os.getenv('KAFKA_POLL_TIMEOUT_MS', 500))  # Longest a consumer waits for messages before checking for shutdown
+KAFKA_MAX_POLL_RECORDS = int(os.getenv('KAFKA_MAX_POLL_RECORDS', 16))  # Default messages per poll; the pipeline consumers take one round of work per poll instead
+KAFKA_MAX_POLL_INTERVAL_MS = int(os.getenv('KAFKA_MAX_POLL_INTERVAL_MS', 300000))  # Longest gap between polls before a consumer is evicted (ingest: one round of OCR); LLM consumers raise it to their worst case
+KAFKA_FETCH_MIN_BYTES = int(os.getenv('KAFKA_FETCH_MIN_BYTES', 64 * 1024))  # Broker holds fetches until this much data is ready...
+KAFKA_FETCH_MAX_WAIT_MS = int(os.getenv('KAFKA_FETCH_MAX_WAIT_MS', 100))  # ...or this long has passed
+KAFKA_COMMIT_EVERY = int(os.getenv('KAFKA_COMMIT_EVERY', 50))  # Processed messages whose offsets are committed together
+KAFKA_COMMIT_INTERVAL_MS = int(os.getenv('KAFKA_COMMIT_INTERVAL_MS', 1000))  # Longest processed offsets wait to be committed
+KAFKA_COMPRESSION_TYPE = os.getenv('KAFKA_COMPRESSION_TYPE', 'lz4') or None  # OCR text compresses well; empty disables compression
+KAFKA_LINGER_MS = int(os.getenv('KAFKA_LINGER_MS', 10))  # Wait for concurrent publishes to share a request
+KAFKA_BATCH_SIZE = int(os.getenv('KAFKA_BATCH_SIZE', 64 * 1024))  # Bytes per partition batch
+CONSUMER_SHUTDOWN_TIMEOUT = float(os.getenv('CONSUMER_SHUTDOWN_TIMEOUT', 10))  # Seconds shutdown waits for in-flight messages
+# Consumers of each topic run in the same group, Kafka splits the topic's partitions among them
+INGEST_CONSUMER_INSTANCES = int(os.getenv('INGEST_CONSUMER_INSTANCES', 2))  # S3 download + OCR
+OCR_CONSUMER_INSTANCES = int(os.getenv('OCR_CONSUMER_INSTANCES', 2))  # LLM field extraction
+METADATA_CONSUMER_INSTANCES = int(os.getenv('METADATA_CONSUMER_INSTANCES', 1))  # LLM categorization
+INGEST_MAX_IN_FLIGHT = int(os.getenv('INGEST_MAX_IN_FLIGHT', 2))  # Messages of one poll each ingest consumer processes concurrently
 
 # S3 settings (LocalStack)
 AWS_ENDPOINT_URL = os.getenv('AWS_ENDPOINT_URL', 'http://localhost:4566')
@@ -49,6 +116,8 @@ S3_BUCKET_NAME = os.getenv('S3_BUCKET_NAME', 'certificate-documents')
 S3_ACCESS_KEY = os.getenv('S3_ACCESS_KEY', 'localstack')
 S3_SECRET_KEY = os.getenv('S3_SECRET_KEY', 'localstack')
 S3_REGION = os.getenv('S3_REGION', 'us-east-1')
+S3_MAX_POOL_CONNECTIONS = int(os.getenv('S3_MAX_POOL_CONNECTIONS', 32))  # Keep-alive connections shared by every thread using the client
+S3_MAX_ATTEMPTS = int(os.getenv('S3_MAX_ATTEMPTS', 3))  # Attempts per S3 call on throttling, 5xx and connection errors
 
 # AWS credentials for LocalStack/Kafka consumers
 AWS_ACCESS_KEY_ID = os.getenv('AWS_ACCESS_KEY_ID', 'test')
@@ -6,7 +6,7 @@ import threading
 import signal
 import sys
 from typing import List
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
 
 from consumers import (
     CertificateIngestConsumer,
@@ -18,12 +18,14 @@ from services.llm_service import LLMService
 from services.s3_service import S3Service
 from services.kafka_service import KafkaService
 from services.prompt_service import PromptService
+from services.cache_service import CacheService
 from services.activity_categorization_service import ActivityCategorizationService
 from repositories.certificate_submission_repository import CertificateSubmissionRepository
 from repositories.certificate_ocr_text_repository import CertificateOcrTextRepository
 from repositories.certificate_metadata_repository import CertificateMetadataRepository
 from repositories.extracted_activity_repository import ExtractedActivityRepository
 from repositories.activity_category_repository import ActivityCategoryRepository
+import config.settings as settings
 
 logger = logging.getLogger(__name__)
 
@@ -35,6 +37,8 @@ class ConsumerManager:
         """Initialize consumer manager."""
         self.consumers = []
         self.executor = None
+        self.futures = []
+        self.llm_service = None
         self.shutdown_event = threading.Event()
         
         # Set up signal handlers for graceful shutdown
@@ -52,8 +56,10 @@ class ConsumerManager:
         
         # Create service instances
         prompt_service = PromptService()
+        cache_service = CacheService()
         ocr_service = OCRService()
-        llm_service = LLMService(prompt_service)
+        llm_service = LLMService(prompt_service, cache_service)
+        self.llm_service = llm_service
         s3_service = S3Service()
         kafka_service = KafkaService()
         
@@ -71,26 +77,31 @@ class ConsumerManager:
         
         logger.info("Creating consumer instances...")
         
-        # Create consumers
-        consumers = [
-            CertificateIngestConsumer(
+        # Create consumers, several per topic when configured; instances of a
+        # topic share its consumer group, so each message is handled once
+        consumers = []
+        for _ in range(settings.INGEST_CONSUMER_INSTANCES):
+            consumers.append(CertificateIngestConsumer(
                 ocr_service, 
                 s3_service, 
                 kafka_service,
                 submission_repository,
                 ocr_text_repository
-            ),
-            CertificateOCRConsumer(
+            ))
+        for _ in range(settings.OCR_CONSUMER_INSTANCES):
+            consumers.append(CertificateOCRConsumer(
                 llm_service, 
                 kafka_service,
                 submission_repository,
-                metadata_repository
-            ),
-            CertificateMetadataConsumer(
+                ocr_text_repository,
+                metadata_repository,
+                category_repository
+            ))
+        for _ in range(settings.METADATA_CONSUMER_INSTANCES):
+            consumers.append(CertificateMetadataConsumer(
                 activity_categorization_service,
                 submission_repository
-            )
-        ]
+            ))
         
         logger.info(f"Created {len(consumers)} consumer instances")
         return consumers
@@ -114,18 +125,17 @@ class ConsumerManager:
             )
             
             # Submit consumer tasks
-            futures = []
             for i, consumer in enumerate(self.consumers):
-                consumer_name = consumer.__class__.__name__
+                consumer_name = f"{consumer.__class__.__name__}-{i+1}"
                 logger.info(f"Starting consumer {i+1}/{len(self.consumers)}: {consumer_name}")
                 
                 future = self.executor.submit(self._run_consumer, consumer, consumer_name)
-                futures.append(future)
+                self.futures.append(future)
             
             logger.info(f"Successfully started {len(self.consumers)} consumers")
             
             # Wait for consumers to complete or shutdown signal
-            for future in as_completed(futures):
+            for future in as_completed(self.futures):
                 try:
                     future.result()
                 except Exception as e:
@@ -154,18 +164,22 @@ class ConsumerManager:
         
         self.shutdown_event.set()
         
-        # Close all consumers
+        # Ask every consumer to stop; each closes its Kafka consumer from its own thread
         for consumer in self.consumers:
-            try:
-                if hasattr(consumer, 'consumer') and consumer.consumer:
-                    consumer.consumer.close()
-            except Exception as e:
-                logger.error(f"Error closing consumer: {e}")
+            consumer.stop()
         
-        # Shutdown thread pool
+        # Shutdown thread pool, waiting a bounded time for messages in progress
         if self.executor:
             logger.info("Shutting down thread pool...")
-            self.executor.shutdown(wait=True, timeout=30)
+            self.executor.shutdown(wait=False)
+            _, not_done = wait(self.futures, timeout=settings.CONSUMER_SHUTDOWN_TIMEOUT)
+            if not_done:
+                logger.warning(
+                    f"{len(not_done)} consumers still processing after {settings.CONSUMER_SHUTDOWN_TIMEOUT}s"
+                )
+        
+        if self.llm_service:
+            self.llm_service.close()
         
         logger.info("Consumer manager shutdown complete")
 
@@ -174,7 +188,7 @@ def main():
     """Main entry point for running consumers."""
     # Configure logging
     logging.basicConfig(
-        level=logging.INFO,
+        level=settings.LOG_LEVEL,
         format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
         handlers=[
             logging.StreamHandler(sys.stdout),
@@ -0,0 +1,156 @@
+"""
+Base class with the polling loop shared by the certificate pipeline consumers.
+"""
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import orjson
+from confluent_kafka import Consumer
+
+import config.settings as settings
+
+logger = logging.getLogger(__name__)
+
+
+class BaseConsumer:
+    """
+    Kafka consumer that polls in short intervals so it can be stopped cooperatively.
+
+    Consumers run on librdkafka (confluent-kafka), which fetches, decompresses
+    and frames messages in C instead of in the interpreter.
+
+    Offsets are committed by the consumer itself (enable.auto.commit=False):
+    messages returned by a poll are processed before the next poll, so each
+    poll first commits the offsets consumed so far, every KAFKA_COMMIT_EVERY
+    messages or KAFKA_COMMIT_INTERVAL_MS, whichever comes first.
+    """
+
+    def __init__(self):
+        """Initialize consumer state."""
+        self.consumer = None
+        self.stop_event = threading.Event()
+        self._uncommitted = 0
+        self._last_commit = time.monotonic()
+
+    @staticmethod
+    def max_poll_interval_ms(processing_time: float) -> int:
+        """
+        Get the max.poll.interval.ms for polls that take long to process.
+
+        Args:
+            processing_time: Worst-case seconds to process the messages of one poll
+
+        Returns:
+            Processing time plus a minute of margin, at least KAFKA_MAX_POLL_INTERVAL_MS
+        """
+        return max(settings.KAFKA_MAX_POLL_INTERVAL_MS, int((processing_time + 60) * 1000))
+
+    @staticmethod
+    def create_consumer(
+        topic: str,
+        group_id: str,
+        max_poll_interval_ms: int = settings.KAFKA_MAX_POLL_INTERVAL_MS
+    ) -> Consumer:
+        """
+        Create a Kafka consumer subscribed to a topic.
+
+        Args:
+            topic: Topic to consume
+            group_id: Consumer group sharing the topic's partitions
+            max_poll_interval_ms: Longest time processing one poll may take before
+                the consumer is evicted from the group and its messages redelivered
+
+        Returns:
+            Subscribed consumer
+        """
+        consumer = Consumer({
+            'bootstrap.servers': ','.join(settings.KAFKA_BOOTSTRAP_SERVERS),
+            'group.id': group_id,
+            'auto.offset.reset': 'earliest',
+            'enable.auto.commit': False,  # Offsets are committed in batches once processed
+            'fetch.min.bytes': settings.KAFKA_FETCH_MIN_BYTES,
+            'fetch.wait.max.ms': settings.KAFKA_FETCH_MAX_WAIT_MS,
+            'max.poll.interval.ms': max_poll_interval_ms
+        })
+        consumer.subscribe([topic])
+        return consumer
+
+    def stop(self) -> None:
+        """
+        Ask the consumer to stop.
+
+        The polling thread notices within KAFKA_POLL_TIMEOUT_MS, finishes the
+        message in progress and closes the Kafka consumer itself, as
+        the Kafka consumer is not safe to close from another thread.
+        """
+        self.stop_event.set()
+
+    def is_running(self) -> bool:
+        """Check whether the consumer should keep polling."""
+        return not self.stop_event.is_set()
+
+    def poll_messages(self, max_records: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Wait up to KAFKA_POLL_TIMEOUT_MS for messages.
+
+        Args:
+            max_records: Maximum number of messages returned, None for the consumer default
+
+        Returns:
+            Deserialized message values, empty when nothing arrived in time
+        """
+        self._commit_processed()
+        first_record = self.consumer.poll(settings.KAFKA_POLL_TIMEOUT_MS / 1000)
+        if first_record is None:
+            return []
+
+        # consume() waits for num_messages to arrive; only take the ones already fetched
+        max_records = max_records or settings.KAFKA_MAX_POLL_RECORDS
+        records = [first_record]
+        if max_records > 1:
+            records += self.consumer.consume(num_messages=max_records - 1, timeout=0)
+        self._uncommitted += len(records)
+
+        messages = []
+        for record in records:
+            if record.error():
+                logger.warning("Kafka consumer error: %s", record.error())
+                continue
+            try:
+                messages.append(orjson.loads(record.value()))
+            except orjson.JSONDecodeError as e:
+                # Skipped rather than retried: the same bytes would fail again
+                logger.error("Skipping undecodable message at offset %s: %s", record.offset(), e)
+        return messages
+
+    def _commit_processed(self, force: bool = False) -> None:
+        """
+        Commit the offsets of messages returned by earlier polls, processed by now.
+
+        Args:
+            force: Commit synchronously regardless of the batch size and interval
+        """
+        if not self._uncommitted:
+            return
+        if not force and self._uncommitted < settings.KAFKA_COMMIT_EVERY \
+                and time.monotonic() - self._last_commit < settings.KAFKA_COMMIT_INTERVAL_MS / 1000:
+            return
+
+        try:
+            self.consumer.commit(asynchronous=not force)
+            self._uncommitted = 0
+        except Exception as e:
+            logger.warning("Failed to commit consumed offsets: %s", e)
+        self._last_commit = time.monotonic()
+
+    def close_consumer(self) -> None:
+        """Commit pending offsets and close the Kafka consumer."""
+        if not self.consumer:
+            return
+
+        try:
+            self._commit_processed(force=True)
+        finally:
+            self.consumer.close()
@@ -1,13 +1,14 @@
 """
 Certificate Ingest Consumer for processing uploaded certificate files.
 """
-import json
 import logging
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any
-from kafka import KafkaConsumer
-from kafka.errors import KafkaError
 from injector import inject
 
+from consumers.base_consumer import BaseConsumer
 from database.connection import get_db_session
 from repositories.certificate_submission_repository import CertificateSubmissionRepository
 from repositories.certificate_ocr_text_repository import CertificateOcrTextRepository
@@ -19,7 +20,7 @@ import config.settings as settings
 logger = logging.getLogger(__name__)
 
 
-class CertificateIngestConsumer:
+class CertificateIngestConsumer(BaseConsumer):
     """Consumer for certificate.ingest topic - processes uploaded files."""
     
     @inject
@@ -32,29 +33,25 @@ class CertificateIngestConsumer:
         ocr_text_repository: CertificateOcrTextRepository
     ):
         """Initialize ingest consumer."""
+        super().__init__()
         self.ocr_service = ocr_service
         self.s3_service = s3_service
         self.kafka_service = kafka_service
         self.submission_repository = submission_repository
         self.ocr_text_repository = ocr_text_repository
-        self.consumer = None
+        # Overlaps S3 downloads, OCR and database writes of the messages of a poll
+        self._message_executor = ThreadPoolExecutor(
+            max_workers=max(1, settings.INGEST_MAX_IN_FLIGHT), thread_name_prefix='ingest-message'
+        )
         self._init_consumer()
     
     def _init_consumer(self) -> None:
         """Initialize Kafka consumer."""
         try:
-            self.consumer = KafkaConsumer(
-                'certificate.ingest',
-                bootstrap_servers=settings.KAFKA_BOOTSTRAP_SERVERS,
-                value_deserializer=lambda m: json.loads(m.decode('utf-8')),
-                key_deserializer=lambda m: m.decode('utf-8') if m else None,
-                group_id='certificate-ingest-group',
-                auto_offset_reset='earliest',
-                enable_auto_commit=True
-            )
+            self.consumer = self.create_consumer('certificate.ingest', 'certificate-ingest-group')
             logger.info("Certificate ingest consumer initialized")
         except Exception as e:
-            logger.error(f"Failed to initialize ingest consumer: {e}")
+            logger.error("Failed to initialize ingest consumer: %s", e)
             self.consumer = None
     
     def process_messages(self) -> None:
@@ -66,27 +63,34 @@ class CertificateIngestConsumer:
         logger.info("Starting certificate ingest message processing...")
         
         try:
-            for message in self.consumer:
-                try:
-                    self._process_ingest_message(message.value)
-                except Exception as e:
-                    logger.error(f"Error processing ingest message: {e}")
-                    # Continue processing other messages
+            while self.is_running():
+                # The next poll commits the offsets of this one, so wait for all of its messages.
+                # One message per worker keeps a poll to a single round of downloads and OCR
+                messages = self.poll_messages(max_records=max(1, settings.INGEST_MAX_IN_FLIGHT))
+                list(self._message_executor.map(self._handle_ingest_message, messages))
         except KeyboardInterrupt:
             logger.info("Stopping ingest consumer...")
         except Exception as e:
-            logger.error(f"Error in ingest consumer: {e}")
+            logger.error("Error in ingest consumer: %s", e)
         finally:
-            if self.consumer:
-                self.consumer.close()
+            self._message_executor.shutdown(wait=True)
+            self.close_consumer()
+    
+    def _handle_ingest_message(self, message: Dict[str, Any]) -> None:
+        """Process an ingest message, logging errors so other messages continue."""
+        try:
+            self._process_ingest_message(message)
+        except Exception as e:
+            logger.error("Error processing ingest message: %s", e)
     
     def _process_ingest_message(self, message: Dict[str, Any]) -> None:
         """Process a single ingest message."""
         submission_id = message['submission_id']
         s3_key = message['s3_key']
         
-        logger.info(f"Processing certificate ingest for submission {submission_id}")
+        logger.info("Processing certificate ingest for submission %s", submission_id)
         
+        ocr_message = None
         with get_db_session() as session:
             # Update submission status to processing
             submission = self.submission_repository.get_by_id(
@@ -94,7 +98,7 @@ class CertificateIngestConsumer:
             )
             
             if not submission:
-                logger.error(f"Submission {submission_id} not found")
+                logger.error("Submission %s not found", submission_id)
                 return
             
             self.submission_repository.update_status(
@@ -102,26 +106,37 @@ class CertificateIngestConsumer:
             )
             
             try:
-                # Download file from S3
-                file_content = self.s3_service.download_file(s3_key)
-                if not file_content:
-                    logger.error(f"Failed to download file {s3_key}")
-                    self.submission_repository.update_status(
-                        session, submission_id, 'failed',
-                        f"Failed to download file from S3: {s3_key}",
-                        update_processing_completed=True
-                    )
-                    return
-                
-                # Get file extension from original filename
-                file_extension = submission.original_filename.split('.')[-1] if submission.original_filename else 'pdf'
+                # Identical files (same SHA-256) produce identical OCR, reuse it when available
+                previous_ocr = self.ocr_text_repository.get_latest_by_file_checksum(
+                    session, submission.file_checksum, exclude_submission_id=submission_id
+                )
                 
-                # Perform OCR with timing
-                import time
-                start_time = time.time()
-                extracted_text, confidence = self.ocr_service.process_file(file_content, file_extension)
-                end_time = time.time()
-                processing_time_ms = int((end_time - start_time) * 1000)
+                if previous_ocr:
+                    logger.info("Reusing OCR text %s for identical file of submission %s", previous_ocr.id, submission_id)
+                    extracted_text = previous_ocr.raw_text
+                    confidence = float(previous_ocr.ocr_confidence) if previous_ocr.ocr_confidence is not None else None
+                    processing_time_ms = 0
+                else:
+                    # Get file extension from original filename
+                    file_extension = submission.original_filename.split('.')[-1] if submission.original_filename else 'pdf'
+                    
+                    # Stream the file from S3 to disk, where pdftoppm and PIL read it
+                    # directly, instead of holding the whole file in memory
+                    with tempfile.NamedTemporaryFile(prefix='certificate_', suffix=f".{file_extension}") as download:
+                        if not self.s3_service.download_to_file(s3_key, download):
+                            logger.error("Failed to download file %s", s3_key)
+                            self.submission_repository.update_status(
+                                session, submission_id, 'failed',
+                                f"Failed to download file from S3: {s3_key}",
+                                update_processing_completed=True
+                            )
+                            return
+                        
+                        # Perform OCR with timing
+                        start_time = time.time()
+                        extracted_text, confidence = self.ocr_service.process_file(download.name, file_extension)
+                        end_time = time.time()
+                        processing_time_ms = int((end_time - start_time) * 1000)
                 
                 # Create OCR result structure
                 ocr_result = {
@@ -139,18 +154,40 @@ class CertificateIngestConsumer:
                     processing_time_ms=ocr_result['processing_time_ms']
                 )
                 
-                # Publish to OCR topic
-                self.kafka_service.publish_certificate_ocr(
-                    submission_id=submission_id,
-                    ocr_text_id=ocr_text.id,
-                    raw_text=ocr_result['text'],
-                    ocr_confidence=ocr_result.get('confidence')
-                )
+                # Blank pages and unrelated documents are rejected here instead of costing an LLM call
+                if not self.ocr_service.looks_like_certificate(extracted_text):
+                    logger.warning("Submission %s rejected: OCR text does not look like a certificate", submission_id)
+                    self.submission_repository.update_status(
+                        session, submission_id, 'failed',
+                        'File does not look like a certificate (no certificate text found)',
+                        update_processing_completed=True
+                    )
+                    return
                 
-                logger.info(f"OCR completed for submission {submission_id}")
+                # Store OCR message data for Kafka publishing after commit
+                ocr_message = {
+                    'submission_id': submission_id,
+                    'ocr_text_id': ocr_text.id,
+                    'ocr_confidence': ocr_result.get('confidence')
+                }
                 
             except Exception as e:
-                logger.error(f"Error processing OCR for submission {submission_id}: {e}")
+                logger.error("Error processing OCR for submission %s: %s", submission_id, e)
                 self.submission_repository.update_status(
                     session, submission_id, 'failed', str(e), update_processing_completed=True
-                )
\ No newline at end of file
+                )
+        
+        if ocr_message is None:
+            return
+        
+        # Database transaction committed here - the OCR consumer reads the text by
+        # ocr_text_id, so the record must exist before the message does
+        if not self.kafka_service.publish_certificate_ocr(**ocr_message):
+            with get_db_session() as session:
+                self.submission_repository.update_status(
+                    session, submission_id, 'failed', 'Failed to publish to processing queue',
+                    update_processing_completed=True
+                )
+            return
+        
+        logger.info("OCR completed for submission %s", submission_id)
\ No newline at end of file
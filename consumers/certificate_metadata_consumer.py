@@ -1,22 +1,19 @@
 """
 Certificate Metadata Consumer for processing metadata and categorizing activities.
 """
-import json
 import logging
 from typing import Dict, Any
-from kafka import KafkaConsumer
-from kafka.errors import KafkaError
 from injector import inject
 
+from consumers.base_consumer import BaseConsumer
 from database.connection import get_db_session
 from repositories.certificate_submission_repository import CertificateSubmissionRepository
 from services.activity_categorization_service import ActivityCategorizationService
-import config.settings as settings
 
 logger = logging.getLogger(__name__)
 
 
-class CertificateMetadataConsumer:
+class CertificateMetadataConsumer(BaseConsumer):
     """Consumer for certificate.metadata topic - processes metadata for categorization."""
     
     @inject
@@ -26,27 +23,23 @@ class CertificateMetadataConsumer:
         submission_repository: CertificateSubmissionRepository
     ):
         """Initialize metadata consumer."""
+        super().__init__()
         self.activity_categorization_service = activity_categorization_service
         self.submission_repository = submission_repository
-        self.consumer = None
         
         self._init_consumer()
     
     def _init_consumer(self) -> None:
         """Initialize Kafka consumer."""
         try:
-            self.consumer = KafkaConsumer(
-                'certificate.metadata',
-                bootstrap_servers=settings.KAFKA_BOOTSTRAP_SERVERS,
-                value_deserializer=lambda m: json.loads(m.decode('utf-8')),
-                key_deserializer=lambda m: m.decode('utf-8') if m else None,
-                group_id='certificate-metadata-group',
-                auto_offset_reset='earliest',
-                enable_auto_commit=True
+            llm_service = self.activity_categorization_service.llm_service
+            self.consumer = self.create_consumer(
+                'certificate.metadata', 'certificate-metadata-group',
+                self.max_poll_interval_ms(llm_service.max_request_time())
             )
             logger.info("Certificate metadata consumer initialized")
         except Exception as e:
-            logger.error(f"Failed to initialize metadata consumer: {e}")
+            logger.error("Failed to initialize metadata consumer: %s", e)
             self.consumer = None
     
     def process_messages(self) -> None:
@@ -58,34 +51,35 @@ class CertificateMetadataConsumer:
         logger.info("Starting certificate metadata message processing...")
         
         try:
-            for message in self.consumer:
-                try:
-                    self._process_metadata_message(message.value)
-                except Exception as e:
-                    logger.error(f"Error processing metadata message: {e}")
+            while self.is_running():
+                # One message per poll, so a poll never waits on more than one categorization
+                for message in self.poll_messages(max_records=1):
+                    try:
+                        self._process_metadata_message(message)
+                    except Exception as e:
+                        logger.error("Error processing metadata message: %s", e)
         except KeyboardInterrupt:
             logger.info("Stopping metadata consumer...")
         except Exception as e:
-            logger.error(f"Error in metadata consumer: {e}")
+            logger.error("Error in metadata consumer: %s", e)
         finally:
-            if self.consumer:
-                self.consumer.close()
+            self.close_consumer()
     
     def _process_metadata_message(self, message: Dict[str, Any]) -> None:
         """Process a single metadata message."""
         submission_id = message['submission_id']
         extracted_data = message['extracted_data']
         
-        logger.info(f"Processing categorization for submission {submission_id}")
+        logger.info("Processing categorization for submission %s", submission_id)
         
         with get_db_session() as session:
             # Update submission status
-            submission = self.submission_repository.get_by_id(
+            submission = self.submission_repository.get_for_processing(
                 session, submission_id
             )
             
             if not submission:
-                logger.error(f"Submission {submission_id} not found")
+                logger.error("Submission %s not found", submission_id)
                 return
             
             self.submission_repository.update_status(
@@ -103,7 +97,7 @@ class CertificateMetadataConsumer:
                 
                 # Use activity categorization service to categorize and persist
                 categorization_result = self.activity_categorization_service.categorize_activity(
-                    extracted_data, submission_id
+                    extracted_data, submission_id, categorization=message.get('categorization')
                 )
                 
                 if categorization_result.get('success', False):
@@ -111,17 +105,17 @@ class CertificateMetadataConsumer:
                     self.submission_repository.update_status(
                         session, submission_id, 'pending_review', update_processing_completed=True
                     )
-                    logger.info(f"Categorization completed for submission {submission_id}")
+                    logger.info("Categorization completed for submission %s", submission_id)
                 else:
                     # Categorization failed
                     error_message = categorization_result.get('error', 'Unknown categorization error')
-                    logger.error(f"Categorization failed for submission {submission_id}: {error_message}")
+                    logger.error("Categorization failed for submission %s: %s", submission_id, error_message)
                     self.submission_repository.update_status(
                         session, submission_id, 'failed', error_message, update_processing_completed=True
                     )
                 
             except Exception as e:
-                logger.error(f"Error categorizing submission {submission_id}: {e}")
+                logger.error("Error categorizing submission %s: %s", submission_id, e)
                 self.submission_repository.update_status(
                     session, submission_id, 'failed', str(e)
                 )
\ No newline at end of file
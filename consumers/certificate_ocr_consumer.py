@@ -1,24 +1,143 @@
 """
 Certificate OCR Consumer for processing OCR results and extracting metadata.
 """
-import json
+import hashlib
 import logging
-from typing import Dict, Any
-from kafka import KafkaConsumer
-from kafka.errors import KafkaError
+import re
+import time
+import unicodedata
+from functools import lru_cache
+from typing import Dict, Any, List, Optional
 from injector import inject
 
+from consumers.base_consumer import BaseConsumer
 from database.connection import get_db_session
 from repositories.certificate_submission_repository import CertificateSubmissionRepository
+from repositories.certificate_ocr_text_repository import CertificateOcrTextRepository
 from repositories.certificate_metadata_repository import CertificateMetadataRepository
+from repositories.activity_category_repository import ActivityCategoryRepository
 from services.llm_service import LLMService
 from services.kafka_service import KafkaService
 import config.settings as settings
 
+try:
+    from rapidfuzz import fuzz
+except ImportError:  # Optional; names are then matched by their shared words
+    fuzz = None
+
 logger = logging.getLogger(__name__)
 
+# First number of an hours text like '40 horas' or '40h'
+_HOURS_RE = re.compile(r'\d+')
+
+_PUNCTUATION_RE = re.compile(r'[^\w\s]')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+# Connectives of Brazilian names, which say nothing about who a name belongs to
+_NAME_PARTICLES = frozenset({'da', 'de', 'do', 'das', 'dos', 'e'})
+# Distinctive words (first name, surnames) two names must share to match
+_MIN_SHARED_NAME_PARTS = 2
+# rapidfuzz ratio at which two words count as the same word misread by OCR (one typo in five letters)
+_NAME_PART_MIN_SCORE = 80
+
+
+def _sha256_text(text: str) -> str:
+    """Get the SHA-256 hex digest identifying an OCR text."""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+@lru_cache(maxsize=4096)
+def _normalize_name(name: str) -> str:
+    """
+    Normalize a name for comparison, cached as a student's name recurs across submissions.
+    
+    Args:
+        name: Person name
+        
+    Returns:
+        Lower-cased name without accents or punctuation, words separated by single spaces
+    """
+    # OCR often drops accents ("Joao" for "João"), so they are not compared
+    decomposed = unicodedata.normalize('NFKD', name.lower())
+    unaccented = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    normalized = _PUNCTUATION_RE.sub('', unaccented)
+    return _WHITESPACE_RE.sub(' ', normalized).strip()
+
+
+@lru_cache(maxsize=4096)
+def _name_tokens(normalized_name: str) -> frozenset:
+    """
+    Split a normalized name into its set of words, cached alongside the normalization.
+    
+    Args:
+        normalized_name: Name returned by _normalize_name
+        
+    Returns:
+        Distinct words of the name, without initials and connectives (da, dos, ...)
+    """
+    return frozenset(
+        token for token in normalized_name.split() if len(token) > 1 and token not in _NAME_PARTICLES
+    )
+
+
+def _shared_name_parts(tokens: frozenset, other_tokens: frozenset) -> int:
+    """
+    Count the words of a name found in another name.
+    
+    With rapidfuzz, words a few OCR typos apart ("silv4" and "silva") count
+    as shared, while different names ("joao" and "joana") do not.
+    
+    Args:
+        tokens: Words of a name, from _name_tokens
+        other_tokens: Words of the other name
+        
+    Returns:
+        Number of words of the first name present in the second
+    """
+    shared = tokens & other_tokens
+    if fuzz is None:
+        return len(shared)
+    
+    return len(shared) + sum(
+        1 for token in tokens - shared
+        if any(fuzz.ratio(token, other) >= _NAME_PART_MIN_SCORE for other in other_tokens - shared)
+    )
+
+
+def _names_match(name: str, other_name: str) -> bool:
+    """
+    Check whether two person names refer to the same person.
+    
+    Names match when they are equal after normalization, or when they share
+    at least two distinctive words (first name and a surname): a certificate
+    naming only "Silva" or "Ana" is not proof it belongs to "João Silva" or
+    "Ana Beatriz Rocha". With rapidfuzz the names must then also reach
+    NAME_MATCH_MIN_SCORE in token set ratio, which accepts a shorter form of
+    the full name ("João Silva" vs "João da Silva Santos").
+    
+    Args:
+        name: Person name
+        other_name: Person name to compare with
+        
+    Returns:
+        True if the names match
+    """
+    normalized = _normalize_name(name)
+    other_normalized = _normalize_name(other_name)
+    if not normalized or not other_normalized:
+        return False
+    if normalized == other_normalized:
+        return True
+    
+    tokens, other_tokens = _name_tokens(normalized), _name_tokens(other_normalized)
+    if _shared_name_parts(tokens, other_tokens) < _MIN_SHARED_NAME_PARTS:
+        return False
+    if fuzz is None:
+        return True
+    return fuzz.token_set_ratio(normalized, other_normalized) >= settings.NAME_MATCH_MIN_SCORE
+
 
-class CertificateOCRConsumer:
+class CertificateOCRConsumer(BaseConsumer):
     """Consumer for certificate.ocr topic - processes OCR results."""
     
     @inject
@@ -27,32 +146,49 @@ class CertificateOCRConsumer:
         llm_service: LLMService,
         kafka_service: KafkaService,
         submission_repository: CertificateSubmissionRepository,
-        metadata_repository: CertificateMetadataRepository
+        ocr_text_repository: CertificateOcrTextRepository,
+        metadata_repository: CertificateMetadataRepository,
+        category_repository: ActivityCategoryRepository
     ):
         """Initialize OCR consumer."""
+        super().__init__()
         self.llm_service = llm_service
         self.kafka_service = kafka_service
         self.submission_repository = submission_repository
+        self.ocr_text_repository = ocr_text_repository
         self.metadata_repository = metadata_repository
-        self.consumer = None
+        self.category_repository = category_repository
         
         self._init_consumer()
     
     def _init_consumer(self) -> None:
         """Initialize Kafka consumer."""
+        if settings.LLM_BATCH_SIZE > 1 and settings.LLM_COMBINED_CATEGORIZATION:
+            # Batched texts arrive already extracted, so there is no request to categorize in
+            logger.warning(
+                "LLM_COMBINED_CATEGORIZATION is ignored with LLM_BATCH_SIZE=%s; "
+                "the metadata consumer categorizes in a separate request",
+                settings.LLM_BATCH_SIZE
+            )
+        
         try:
-            self.consumer = KafkaConsumer(
-                'certificate.ocr',
-                bootstrap_servers=settings.KAFKA_BOOTSTRAP_SERVERS,
-                value_deserializer=lambda m: json.loads(m.decode('utf-8')),
-                key_deserializer=lambda m: m.decode('utf-8') if m else None,
-                group_id='certificate-ocr-group',
-                auto_offset_reset='earliest',
-                enable_auto_commit=True
+            # A text extracted on its own: in combined mode, the combined request
+            # and then, if its reply is unusable, a full extraction
+            text_time = self.llm_service.max_extraction_time()
+            if settings.LLM_COMBINED_CATEGORIZATION:
+                text_time += self.llm_service.max_request_time()
+            
+            if settings.LLM_BATCH_SIZE > 1:
+                # One batched request, then each text the batch missed on its own
+                poll_time = self.llm_service.max_request_time() + settings.LLM_BATCH_SIZE * text_time
+            else:
+                poll_time = text_time
+            self.consumer = self.create_consumer(
+                'certificate.ocr', 'certificate-ocr-group', self.max_poll_interval_ms(poll_time)
             )
             logger.info("Certificate OCR consumer initialized")
         except Exception as e:
-            logger.error(f"Failed to initialize OCR consumer: {e}")
+            logger.error("Failed to initialize OCR consumer: %s", e)
             self.consumer = None
     
     def process_messages(self) -> None:
@@ -64,30 +200,132 @@ class CertificateOCRConsumer:
         logger.info("Starting certificate OCR message processing...")
         
         try:
-            for message in self.consumer:
-                try:
-                    self._process_ocr_message(message.value)
-                except Exception as e:
-                    logger.error(f"Error processing OCR message: {e}")
+            if settings.LLM_BATCH_SIZE > 1:
+                self._process_message_batches()
+            else:
+                while self.is_running():
+                    # One message per poll, so a poll never waits on more than one extraction
+                    for message in self.poll_messages(max_records=1):
+                        try:
+                            self._process_ocr_message(message)
+                        except Exception as e:
+                            logger.error("Error processing OCR message: %s", e)
         except KeyboardInterrupt:
             logger.info("Stopping OCR consumer...")
         except Exception as e:
-            logger.error(f"Error in OCR consumer: {e}")
+            logger.error("Error in OCR consumer: %s", e)
         finally:
-            if self.consumer:
-                self.consumer.close()
+            self.close_consumer()
+    
+    def _process_message_batches(self) -> None:
+        """
+        Process messages in batches of up to LLM_BATCH_SIZE sharing one LLM request.
+        
+        Only messages already waiting are batched, so a lone message is not
+        delayed waiting for others.
+        """
+        while self.is_running():
+            messages = self.poll_messages(max_records=settings.LLM_BATCH_SIZE)
+            if not messages:
+                continue
+            
+            text_hashes: List[Optional[str]] = [None] * len(messages)
+            metadata_results: List[Optional[Dict[str, Any]]] = [None] * len(messages)
+            processing_times: List[Optional[int]] = [None] * len(messages)
+            raw_texts: Optional[Dict[int, str]] = None
+            try:
+                with get_db_session() as session:
+                    raw_texts = self.ocr_text_repository.get_raw_texts(
+                        session, [message['ocr_text_id'] for message in messages]
+                    )
+                    texts: List[Optional[str]] = []
+                    for message in messages:
+                        try:
+                            texts.append(self._get_raw_text(message, raw_texts))
+                        except ValueError:
+                            # Left to _process_ocr_message, which fails the submission
+                            texts.append(None)
+                    
+                    for index, text in enumerate(texts):
+                        if text is None:
+                            continue
+                        text_hashes[index] = _sha256_text(text)
+                        metadata_results[index] = self._get_previous_extraction(session, text_hashes[index])
+                        if metadata_results[index] is not None:
+                            processing_times[index] = 0
+                
+                # Only texts never extracted before go to the LLM
+                missing = [
+                    index for index, result in enumerate(metadata_results)
+                    if result is None and texts[index] is not None
+                ]
+                if missing:
+                    start_time = time.time()
+                    extracted = self.llm_service.extract_fields_batch([texts[index] for index in missing])
+                    processing_time_ms = int((time.time() - start_time) * 1000 / len(missing))
+                    for index, metadata_result in zip(missing, extracted):
+                        metadata_results[index] = metadata_result
+                        processing_times[index] = processing_time_ms
+            except Exception as e:
+                logger.error("Error extracting metadata for batch of %s messages: %s", len(messages), e)
+            
+            for message, metadata_result, processing_time_ms, text_sha256 in zip(
+                messages, metadata_results, processing_times, text_hashes
+            ):
+                try:
+                    self._process_ocr_message(message, metadata_result, processing_time_ms, text_sha256, raw_texts)
+                except Exception as e:
+                    logger.error("Error processing OCR message: %s", e)
+    
+    def _get_previous_extraction(self, session, text_sha256: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the fields extracted earlier from an identical OCR text.
+        
+        Args:
+            session: Database session
+            text_sha256: SHA-256 hex digest of the OCR text
+            
+        Returns:
+            Extracted fields, or None if the text still has to go to the LLM
+        """
+        previous_metadata = self.metadata_repository.get_latest_by_text_sha256(session, text_sha256)
+        if not previous_metadata:
+            return None
+        
+        logger.info("Reusing fields of metadata %s extracted from an identical text", previous_metadata.id)
+        return previous_metadata.to_extracted_fields()
+    
+    @staticmethod
+    def _get_raw_text(message: Dict[str, Any], raw_texts: Dict[int, str]) -> str:
+        """
+        Get the OCR text of a message.
+        
+        Args:
+            message: OCR message
+            raw_texts: Raw text by OCR text ID, as loaded from the database
+            
+        Returns:
+            OCR text, taken from the message itself when published before
+            messages stopped carrying it
+            
+        Raises:
+            ValueError: If the OCR text record does not exist
+        """
+        if message.get('raw_text'):
+            return message['raw_text']
+        
+        ocr_text_id = message['ocr_text_id']
+        if ocr_text_id not in raw_texts:
+            raise ValueError(f"OCR text {ocr_text_id} not found")
+        return raw_texts[ocr_text_id]
     
     def _extract_numeric_hours(self, hours_text: str) -> int:
         """Extract numeric hours from text like '40 horas' or '40h'."""
         if not hours_text:
             return None
         
-        import re
-        # Look for numbers in the text
-        numbers = re.findall(r'\d+', str(hours_text))
-        if numbers:
-            return int(numbers[0])
-        return None
+        match = _HOURS_RE.search(str(hours_text))
+        return int(match.group()) if match else None
     
     def _validate_participant_name(self, extracted_participant: str, student_name: str) -> bool:
         """
@@ -104,59 +342,45 @@ class CertificateOCRConsumer:
             logger.warning("Missing participant name or student name for validation")
             return False
         
-        # Normalize names for comparison
-        def normalize_name(name):
-            import re
-            # Convert to lowercase, remove extra spaces, and common name variations
-            normalized = re.sub(r'[^\w\s]', '', name.lower())  # Remove punctuation
-            normalized = re.sub(r'\s+', ' ', normalized).strip()  # Normalize spaces
-            return normalized
-        
-        extracted_normalized = normalize_name(extracted_participant)
-        student_normalized = normalize_name(student_name)
-        
-        # Exact match after normalization
-        if extracted_normalized == student_normalized:
+        if _names_match(extracted_participant, student_name):
             return True
         
-        # Check if one name is contained within the other (handles full name vs. partial name)
-        # For example: "João Silva" vs "João da Silva Santos"
-        extracted_parts = set(extracted_normalized.split())
-        student_parts = set(student_normalized.split())
-        
-        # Calculate intersection of name parts
-        common_parts = extracted_parts.intersection(student_parts)
-        
-        # Require at least 2 matching parts for common Brazilian names (first + last name)
-        if len(common_parts) >= 2:
-            return True
-        
-        # If only one part matches, check if it's substantial (more than 3 characters)
-        if len(common_parts) == 1:
-            matching_part = list(common_parts)[0]
-            if len(matching_part) > 3:  # Substantial name part
-                return True
-        
         # Log the validation failure for debugging
-        logger.info(f"Name validation failed: extracted='{extracted_participant}' vs student='{student_name}'")
+        logger.info("Name validation failed: extracted='%s' vs student='%s'", extracted_participant, student_name)
         return False
     
-    def _process_ocr_message(self, message: Dict[str, Any]) -> None:
-        """Process a single OCR message."""
+    def _process_ocr_message(
+        self,
+        message: Dict[str, Any],
+        metadata_result: Optional[Dict[str, Any]] = None,
+        processing_time_ms: Optional[int] = None,
+        text_sha256: Optional[str] = None,
+        raw_texts: Optional[Dict[int, str]] = None
+    ) -> None:
+        """
+        Process a single OCR message.
+        
+        Args:
+            message: OCR message
+            metadata_result: Fields already extracted for the message in a batch, None to extract them
+            processing_time_ms: Per-message share of the batch extraction time
+            text_sha256: SHA-256 of the OCR text, computed along with the batch extraction
+            raw_texts: Raw texts the batch loaded by OCR text ID, None to load the message's own
+        """
         submission_id = message['submission_id']
         ocr_text_id = message['ocr_text_id']
-        raw_text = message['raw_text']
         
-        logger.info(f"Processing metadata extraction for submission {submission_id}")
+        logger.info("Processing metadata extraction for submission %s", submission_id)
         
         with get_db_session() as session:
             # Update submission status
-            submission = self.submission_repository.get_by_id(
-                session, submission_id
+            # The text is read by ocr_text_id, the joined OCR text would go unused
+            submission = self.submission_repository.get_for_processing(
+                session, submission_id, load_ocr_text=False
             )
             
             if not submission:
-                logger.error(f"Submission {submission_id} not found")
+                logger.error("Submission %s not found", submission_id)
                 return
             
             self.submission_repository.update_status(
@@ -164,12 +388,31 @@ class CertificateOCRConsumer:
             )
             
             try:
-                # Extract metadata using LLM with timing
-                import time
-                start_time = time.time()
-                metadata_result = self.llm_service.extract_fields(raw_text)
-                end_time = time.time()
-                processing_time_ms = int((end_time - start_time) * 1000)
+                categorization = None
+                if metadata_result is None:
+                    # The text is loaded once per message: by the batch, or here for single messages
+                    if raw_texts is None:
+                        raw_texts = self.ocr_text_repository.get_raw_texts(session, [ocr_text_id])
+                    raw_text = self._get_raw_text(message, raw_texts)
+                    text_sha256 = _sha256_text(raw_text)
+                    
+                    # Identical OCR texts (re-uploads, certificates of the same template
+                    # and person) reuse the stored extraction instead of calling the LLM
+                    metadata_result = self._get_previous_extraction(session, text_sha256)
+                    processing_time_ms = 0
+                
+                if metadata_result is None:
+                    # Extract metadata using LLM with timing
+                    start_time = time.time()
+                    if settings.LLM_COMBINED_CATEGORIZATION:
+                        # Category chosen in the same request, the metadata consumer reuses it
+                        metadata_result, categorization = self.llm_service.extract_fields_and_categorize(
+                            raw_text, self.category_repository.get_categories_formatted_text(session)
+                        )
+                    else:
+                        metadata_result = self.llm_service.extract_fields(raw_text)
+                    end_time = time.time()
+                    processing_time_ms = int((end_time - start_time) * 1000)
                 
                 # Always save metadata to database for audit purposes (map Portuguese LLM response to English DB fields)
                 metadata = self.metadata_repository.create_metadata(
@@ -181,17 +424,18 @@ class CertificateOCRConsumer:
                     event_date=metadata_result.get('data'),  # data -> event_date
                     original_hours=metadata_result.get('carga_horaria'),  # carga_horaria -> original_hours
                     numeric_hours=self._extract_numeric_hours(metadata_result.get('carga_horaria')),  # extract numeric value
-                    processing_time_ms=processing_time_ms
+                    processing_time_ms=processing_time_ms,
+                    text_sha256=text_sha256
                 )
                 
                 # Validate participant name matches student who submitted the document
-                extracted_participant = metadata_result.get('nome_participante', '').strip()
+                extracted_participant = (metadata_result.get('nome_participante') or '').strip()
                 student_name = submission.student.name.strip() if submission.student else ''
                 
                 if not self._validate_participant_name(extracted_participant, student_name):
                     error_msg = f"Certificate participant '{extracted_participant}' does not match student '{student_name}' who submitted the file"
-                    logger.warning(f"Validation failed for submission {submission_id}: {error_msg}")
-                    logger.info(f"Metadata saved for audit (ID: {metadata.id}) despite validation failure")
+                    logger.warning("Validation failed for submission %s: %s", submission_id, error_msg)
+                    logger.info("Metadata saved for audit (ID: %s) despite validation failure", metadata.id)
                     self.submission_repository.update_status(
                         session, submission_id, 'failed', error_msg, update_processing_completed=True
                     )
@@ -201,13 +445,14 @@ class CertificateOCRConsumer:
                 self.kafka_service.publish_certificate_metadata(
                     submission_id=submission_id,
                     metadata_id=metadata.id,
-                    extracted_data=metadata_result
+                    extracted_data=metadata_result,
+                    categorization=categorization
                 )
                 
-                logger.info(f"Metadata extraction and validation completed for submission {submission_id}")
+                logger.info("Metadata extraction and validation completed for submission %s", submission_id)
                 
             except Exception as e:
-                logger.error(f"Error extracting metadata for submission {submission_id}: {e}")
+                logger.error("Error extracting metadata for submission %s: %s", submission_id, e)
                 self.submission_repository.update_status(
                     session, submission_id, 'failed', str(e), update_processing_completed=True
                 )
\ No newline at end of file
@@ -1,21 +1,12 @@
 """
 Database connection and session management.
 """
-from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-import config.settings as settings
 
-# Create database engine
-engine = create_engine(
-    settings.DATABASE_URL,
-    pool_pre_ping=True,
-    pool_recycle=300,
-    echo=False  # Set to True for SQL debugging
-)
-
-# Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Engine, session factory and session context manager are defined once, in
+# database.connection; a second engine here would hold its own pool that
+# nothing but this module uses
+from database.connection import engine, SessionLocal, get_db_session
 
 # Create base class for models
 Base = declarative_base()
@@ -35,12 +26,3 @@ except ImportError:
 def Session():
     """Create a new database session."""
     return SessionLocal()
-
-
-def get_db_session():
-    """Get database session with context manager support."""
-    session = SessionLocal()
-    try:
-        yield session
-    finally:
-        session.close()
\ No newline at end of file
@@ -1,28 +1,53 @@
 """
 Database connection and session management.
 """
+import hashlib
 import logging
 from contextlib import contextmanager
-from sqlalchemy import create_engine
+from sqlalchemy import Column, MetaData, String, Table, create_engine, select, text
 from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy.pool import QueuePool
+from sqlalchemy.pool import NullPool, QueuePool
 import config.settings as settings
 
 logger = logging.getLogger(__name__)
 
+if settings.DB_NULL_POOL:
+    # Every session opens its own connection and closes it when done, so no
+    # process holds idle connections (connection pooling is left to PgBouncer)
+    pool_options = {'poolclass': NullPool}
+else:
+    pool_options = {
+        'poolclass': QueuePool,
+        'pool_size': settings.DB_POOL_SIZE,
+        'max_overflow': settings.DB_MAX_OVERFLOW,
+        # Fail the request instead of queueing behind an exhausted pool
+        'pool_timeout': settings.DB_POOL_TIMEOUT,
+        'pool_pre_ping': True,
+        'pool_recycle': settings.DB_POOL_RECYCLE,
+        # Reuse the most recently returned connection, so idle ones can time out
+        # server-side instead of every connection being kept barely warm
+        'pool_use_lifo': True,
+        'pool_reset_on_return': 'rollback'
+    }
+
 # Create database engine
 engine = create_engine(
     settings.DATABASE_URL,
-    poolclass=QueuePool,
-    pool_size=10,
-    max_overflow=20,
-    pool_pre_ping=True,
+    **pool_options,
+    connect_args={'options': f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"},
     echo=False  # Set to True for SQL logging in development
 )
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Hash of the model schema the tables were last created from; kept out of the
+# models' metadata so it does not take part in its own hash
+schema_version = Table(
+    'schema_version', MetaData(),
+    Column('schema_hash', String(64), primary_key=True)
+)
+
 
 @contextmanager
 def get_db_session():
@@ -61,22 +86,48 @@ def get_session() -> Session:
     return SessionLocal()
 
 
+def schema_hash(metadata: MetaData) -> str:
+    """
+    Hash the tables and columns declared by the models.
+    
+    Args:
+        metadata: Metadata the models are registered with
+        
+    Returns:
+        Hex SHA-256 digest, changing whenever a table or column is added, renamed or removed
+    """
+    tables = sorted(
+        (name, tuple(sorted(table.columns.keys()))) for name, table in metadata.tables.items()
+    )
+    return hashlib.sha256(repr(tables).encode('utf-8')).hexdigest()
+
+
 def init_database():
     """
     Initialize database tables.
     
     This should be called during application startup.
     Models are already imported in database/__init__.py
+    
+    create_all inspects every table, so it only runs when the model schema
+    differs from the one recorded in schema_version by the last run.
     """
     try:
         from database import Base
         
-        # Check if we can connect to the database first
-        with engine.connect() as conn:
+        current_hash = schema_hash(Base.metadata)
+        with engine.begin() as conn:
             logger.info("Database connection established")
-        
-        # Create tables if they don't exist
-        Base.metadata.create_all(bind=engine, checkfirst=True)
+            
+            schema_version.create(conn, checkfirst=True)
+            if conn.execute(select(schema_version.c.schema_hash)).scalar() == current_hash:
+                logger.info("Database schema unchanged, skipping table creation")
+                return
+            
+            # Create tables if they don't exist
+            Base.metadata.create_all(bind=conn, checkfirst=True)
+            conn.execute(schema_version.delete())
+            conn.execute(schema_version.insert().values(schema_hash=current_hash))
         logger.info("Database tables initialized successfully")
         
     except Exception as e:
@@ -94,8 +145,9 @@ def health_check() -> bool:
         True if database is accessible, False otherwise
     """
     try:
-        with get_db_session() as session:
-            session.execute('SELECT 1')
+        # A bare connection: no session or transaction is needed for SELECT 1
+        with engine.connect() as conn:
+            conn.execute(text('SELECT 1'))
         return True
     except Exception as e:
         logger.error(f"Database health check failed: {e}")
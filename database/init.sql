@@ -70,6 +70,7 @@ CREATE TABLE certificate_metadata (
     event_date VARCHAR(200),
     original_hours VARCHAR(100),
     numeric_hours INTEGER,
+    text_sha256 VARCHAR(64), -- SHA-256 of the OCR text the fields were extracted from
     processing_time_ms INTEGER,
     extracted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
@@ -105,9 +106,10 @@ CREATE TABLE extracted_activities (
 );
 -- Create indexes for better performance
 CREATE INDEX idx_extracted_activities_category ON extracted_activities(category_id);
+CREATE INDEX idx_extracted_activities_final_category ON extracted_activities(final_category_id);
 CREATE INDEX idx_extracted_activities_processed_at ON extracted_activities(processed_at);
 CREATE INDEX idx_extracted_activities_review_status ON extracted_activities(review_status);
-CREATE INDEX idx_extracted_activities_student ON extracted_activities(student_id);
+CREATE INDEX idx_extracted_activities_student_status ON extracted_activities(student_id, review_status);
 CREATE INDEX idx_extracted_activities_submission ON extracted_activities(submission_id);
 CREATE INDEX idx_certificate_submissions_checksum ON certificate_submissions(file_checksum);
 CREATE INDEX idx_certificate_submissions_student_checksum ON certificate_submissions(student_id, file_checksum);
@@ -116,6 +118,7 @@ CREATE INDEX idx_certificate_submissions_student ON certificate_submissions(stud
 CREATE INDEX idx_students_enrollment ON students(enrollment_number);
 CREATE INDEX idx_certificate_ocr_texts_submission ON certificate_ocr_texts(submission_id);
 CREATE INDEX idx_certificate_metadata_submission ON certificate_metadata(submission_id);
+CREATE INDEX idx_certificate_metadata_text_sha256 ON certificate_metadata(text_sha256);
 
 -- Seed data with correct activity categories
 INSERT INTO activity_categories (name, description, calculation_type, hours_awarded, input_unit, input_quantity, output_hours, max_total_hours) VALUES
@@ -0,0 +1,32 @@
+"""
+Gunicorn configuration for the Flask API.
+"""
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', 5000)}"
+workers = int(os.getenv('GUNICORN_WORKERS', 2))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+
+# Upload requests mostly wait on S3, PostgreSQL and Kafka (OCR and the LLM run
+# in the consumers), so threaded workers keep accepting uploads while others
+# are blocked on I/O.
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', 8))
+
+# Import the application once in the master process so workers share its
+# modules and read-only state copy-on-write instead of each loading them.
+preload_app = True
+
+
+def post_fork(server, worker):
+    """Give each worker its own database connections instead of the master's."""
+    from database.connection import engine
+
+    engine.dispose(close=False)
+
+
+def post_worker_init(worker):
+    """Build the services in each worker before it accepts requests."""
+    from main import warm_up_services
+
+    warm_up_services(worker.wsgi)
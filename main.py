@@ -1,11 +1,25 @@
 """
 Main application entry point for OCR Certificate Extraction service.
 """
+from decimal import Decimal
+from typing import Any, Union
+
 from flask import Flask
+from flask.json.provider import JSONProvider
 import logging
+import orjson
 from flask_injector import FlaskInjector
 
 from config.injection import ServiceModule
+from services.certificate_submission_service import CertificateSubmissionService
+from services.llm_service import LLMService
+from services.s3_service import S3Service
+from repositories.student_repository import StudentRepository
+from repositories.certificate_submission_repository import CertificateSubmissionRepository
+from repositories.certificate_ocr_text_repository import CertificateOcrTextRepository
+from repositories.certificate_metadata_repository import CertificateMetadataRepository
+from repositories.extracted_activity_repository import ExtractedActivityRepository
+from repositories.activity_category_repository import ActivityCategoryRepository
 from routes.health import health_bp
 from routes.certificate import certificate_bp
 from routes.coordinator import coordinator_bp
@@ -14,13 +28,63 @@ from database.connection import init_database
 import config.settings as settings
 
 # Configure logging
-logging.basicConfig(level=logging.INFO)
+logging.basicConfig(level=settings.LOG_LEVEL)
 logger = logging.getLogger(__name__)
 
+# Dependencies injected into route handlers
+ROUTE_DEPENDENCIES = (
+    CertificateSubmissionService,
+    LLMService,
+    S3Service,
+    StudentRepository,
+    CertificateSubmissionRepository,
+    CertificateOcrTextRepository,
+    CertificateMetadataRepository,
+    ExtractedActivityRepository,
+    ActivityCategoryRepository
+)
+
+
+class OrjsonProvider(JSONProvider):
+    """
+    JSON provider serializing responses with orjson.
+    
+    Datetimes and dates are written in ISO 8601 by orjson itself, so models
+    hand them over as-is instead of formatting every field in Python.
+    """
+    
+    options = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+    
+    @staticmethod
+    def _default(obj: Any) -> Any:
+        """Serialize the types orjson does not handle natively, as Flask's default provider does."""
+        if isinstance(obj, Decimal):
+            return str(obj)
+        if hasattr(obj, '__html__'):
+            return str(obj.__html__())
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+    
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        """Serialize data as a JSON string."""
+        return orjson.dumps(obj, default=self._default, option=self.options).decode('utf-8')
+    
+    def loads(self, s: Union[str, bytes], **kwargs: Any) -> Any:
+        """Deserialize data from a JSON string or bytes."""
+        return orjson.loads(s)
+    
+    def response(self, *args: Any, **kwargs: Any):
+        """Build a JSON response without decoding the serialized bytes."""
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=self._default, option=self.options),
+            mimetype='application/json'
+        )
+
 
 def create_app():
     """Create and configure the Flask application."""
     app = Flask(__name__)
+    app.json = OrjsonProvider(app)
     
     # Configure Flask settings
     app.config['MAX_CONTENT_LENGTH'] = settings.MAX_CONTENT_LENGTH
@@ -40,13 +104,32 @@ def create_app():
     app.register_blueprint(student_bp)
     
     # Configure dependency injection
-    FlaskInjector(app=app, modules=[ServiceModule])
+    flask_injector = FlaskInjector(app=app, modules=[ServiceModule])
+    app.extensions['injector'] = flask_injector.injector
     
     return app
 
 
+def warm_up_services(app: Flask) -> None:
+    """
+    Build the route dependencies before the first request is served.
+    
+    Must run in the process serving requests (after the gunicorn fork),
+    since services hold connections and background threads. Wiring errors
+    surface at boot and no request pays for constructing the graph.
+    
+    Args:
+        app: Application created by create_app
+    """
+    injector = app.extensions['injector']
+    for dependency in ROUTE_DEPENDENCIES:
+        injector.get(dependency)
+    logger.info(f"Initialized {len(ROUTE_DEPENDENCIES)} route dependencies")
+
+
 if __name__ == '__main__':
     app = create_app()
+    warm_up_services(app)
     app.run(
         host=settings.HOST,
         port=settings.PORT,
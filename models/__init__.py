@@ -23,5 +23,4 @@ __all__ = [
     'ActivityCategory',
     'Base',
     'db'
-    'Base'
 ]
\ No newline at end of file
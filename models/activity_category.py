@@ -21,7 +21,10 @@ class ActivityCategory(Base):
     output_hours = Column(Integer)  # How many hours are awarded for that input quantity
     max_total_hours = Column(Integer)  # Maximum hours student can have in this category
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
-    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    # Bumped on every ORM update; the category cache is keyed on its maximum
+    updated_at = Column(
+        DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc)
+    )
     
     # Relationships
     activities = relationship('ExtractedActivity', foreign_keys='ExtractedActivity.category_id', back_populates='category')
@@ -43,6 +46,6 @@ class ActivityCategory(Base):
             'input_quantity': self.input_quantity,
             'output_hours': self.output_hours,
             'max_total_hours': self.max_total_hours,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
         }
\ No newline at end of file
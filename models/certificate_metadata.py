@@ -12,7 +12,7 @@ class CertificateMetadata(Base):
     __tablename__ = 'certificate_metadata'
     
     id = Column(Integer, primary_key=True)
-    submission_id = Column(Integer, ForeignKey('certificate_submissions.id'))
+    submission_id = Column(Integer, ForeignKey('certificate_submissions.id'), index=True)
     
     # LLM extracted fields (English column names)
     participant_name = Column(String(500))
@@ -22,6 +22,9 @@ class CertificateMetadata(Base):
     original_hours = Column(String(100))
     numeric_hours = Column(Integer)
     
+    # SHA-256 of the OCR text, so identical texts reuse the extraction
+    text_sha256 = Column(String(64), index=True)
+    
     # Processing metadata
     processing_time_ms = Column(Integer)
     extracted_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
@@ -45,5 +48,15 @@ class CertificateMetadata(Base):
             'numeric_hours': self.numeric_hours,
 
             'processing_time_ms': self.processing_time_ms,
-            'extracted_at': self.extracted_at.isoformat() if self.extracted_at else None
+            'extracted_at': self.extracted_at
+        }
+    
+    def to_extracted_fields(self):
+        """Convert metadata back to the Portuguese fields returned by the LLM."""
+        return {
+            'nome_participante': self.participant_name,
+            'evento': self.event_name,
+            'local': self.location,
+            'data': self.event_date,
+            'carga_horaria': self.original_hours
         }
\ No newline at end of file
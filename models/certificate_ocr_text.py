@@ -12,7 +12,7 @@ class CertificateOcrText(Base):
     __tablename__ = 'certificate_ocr_texts'
     
     id = Column(Integer, primary_key=True)
-    submission_id = Column(Integer, ForeignKey('certificate_submissions.id'))
+    submission_id = Column(Integer, ForeignKey('certificate_submissions.id'), index=True)
     raw_text = Column(Text, nullable=False)
     ocr_confidence = Column(DECIMAL(5, 2))
     processing_time_ms = Column(Integer)
@@ -32,5 +32,5 @@ class CertificateOcrText(Base):
             'raw_text': self.raw_text,
             'ocr_confidence': float(self.ocr_confidence) if self.ocr_confidence else None,
             'processing_time_ms': self.processing_time_ms,
-            'extracted_at': self.extracted_at.isoformat() if self.extracted_at else None
+            'extracted_at': self.extracted_at
         }
\ No newline at end of file
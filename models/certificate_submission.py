@@ -12,13 +12,13 @@ class CertificateSubmission(Base):
     __tablename__ = 'certificate_submissions'
     
     id = Column(Integer, primary_key=True)
-    student_id = Column(Integer, ForeignKey('students.id'))
+    student_id = Column(Integer, ForeignKey('students.id'), index=True)
     original_filename = Column(String(500))
     s3_key = Column(String(1000), nullable=False)
     file_checksum = Column(String(64), unique=True, nullable=False)  # SHA-256
     file_size = Column(BigInteger)
     mime_type = Column(String(100))
-    status = Column(String(50), default='uploaded')  # uploaded, queued, ocr_processing, etc.
+    status = Column(String(50), default='uploaded', index=True)  # uploaded, queued, ocr_processing, etc.
     error_message = Column(String(1000))
     submitted_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
     processing_started_at = Column(DateTime)
@@ -48,10 +48,10 @@ class CertificateSubmission(Base):
             'mime_type': self.mime_type,
             'status': self.status,
             'error_message': self.error_message,
-            'submitted_at': self.submitted_at.isoformat() if self.submitted_at else None,
-            'processing_started_at': self.processing_started_at.isoformat() if self.processing_started_at else None,
-            'processing_completed_at': self.processing_completed_at.isoformat() if self.processing_completed_at else None,
-            'rejected_at': self.rejected_at.isoformat() if self.rejected_at else None,
+            'submitted_at': self.submitted_at,
+            'processing_started_at': self.processing_started_at,
+            'processing_completed_at': self.processing_completed_at,
+            'rejected_at': self.rejected_at,
             'rejection_reason': self.rejection_reason,
             'rejected_by': self.rejected_by
         }
\ No newline at end of file
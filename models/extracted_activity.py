@@ -1,7 +1,7 @@
 """
 Extracted activity model for activity categorization and coordinator review.
 """
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, DECIMAL
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, DECIMAL, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
 from database import Base
@@ -10,9 +10,13 @@ from database import Base
 class ExtractedActivity(Base):
     """Model for storing extracted and processed activity data with coordinator review."""
     __tablename__ = 'extracted_activities'
+    __table_args__ = (
+        # A student's activities in a given review status; also serves lookups by student alone
+        Index('ix_activity_student_status', 'student_id', 'review_status'),
+    )
     
     id = Column(Integer, primary_key=True)
-    submission_id = Column(Integer, ForeignKey('certificate_submissions.id'))
+    submission_id = Column(Integer, ForeignKey('certificate_submissions.id'), index=True)
     metadata_id = Column(Integer, ForeignKey('certificate_metadata.id'))
     student_id = Column(Integer, ForeignKey('students.id'))
     
@@ -22,7 +26,7 @@ class ExtractedActivity(Base):
     llm_reasoning = Column(Text)
     
     # Review workflow fields
-    review_status = Column(String(50), default='pending_review')  # 'pending_review', 'approved', 'rejected', 'manual_override'
+    review_status = Column(String(50), default='pending_review', index=True)  # 'pending_review', 'approved', 'rejected', 'manual_override'
     coordinator_id = Column(String(100))  # ID of coordinator who reviewed
     coordinator_comments = Column(Text)
     reviewed_at = Column(DateTime)
@@ -33,7 +37,7 @@ class ExtractedActivity(Base):
     override_reasoning = Column(Text)
     
     # Final approved values (either LLM or override)
-    final_category_id = Column(Integer, ForeignKey('activity_categories.id'))
+    final_category_id = Column(Integer, ForeignKey('activity_categories.id'), index=True)
     final_hours = Column(Integer)
     
     processed_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
@@ -49,7 +53,7 @@ class ExtractedActivity(Base):
     final_category = relationship('ActivityCategory', foreign_keys='ExtractedActivity.final_category_id')
     
     def __repr__(self):
-        return f'<ExtractedActivity {self.id}: {self.event_name}>'
+        return f'<ExtractedActivity {self.id}: submission {self.submission_id}>'
     
     def to_dict(self):
         """Convert activity to dictionary for API responses."""
@@ -58,28 +62,19 @@ class ExtractedActivity(Base):
             'submission_id': self.submission_id,
             'metadata_id': self.metadata_id,
             'student_id': self.student_id,
-            'enrollment_number': self.enrollment_number,
-            'filename': self.filename,
-            'participant_name': self.participant_name,
-            'event_name': self.event_name,
-            'location': self.location,
-            'event_date': self.event_date,
-            'original_hours': self.original_hours,
-            'numeric_hours': self.numeric_hours,
             'category_id': self.category_id,
             'calculated_hours': self.calculated_hours,
             'llm_reasoning': self.llm_reasoning,
-            'raw_text': self.raw_text,
             'review_status': self.review_status,
             'coordinator_id': self.coordinator_id,
             'coordinator_comments': self.coordinator_comments,
-            'reviewed_at': self.reviewed_at.isoformat() if self.reviewed_at else None,
+            'reviewed_at': self.reviewed_at,
             'override_category_id': self.override_category_id,
             'override_hours': self.override_hours,
             'override_reasoning': self.override_reasoning,
             'final_category_id': self.final_category_id,
             'final_hours': self.final_hours,
-            'processed_at': self.processed_at.isoformat() if self.processed_at else None,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+            'processed_at': self.processed_at,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
         }
\ No newline at end of file
@@ -33,6 +33,6 @@ class Student(Base):
             'name': self.name,
             'email': self.email,
             'total_approved_hours': self.total_approved_hours,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
         }
\ No newline at end of file
@@ -1,8 +1,10 @@
 """
 Repository for ActivityCategory database operations.
 """
-from typing import List, Optional, Dict
-from sqlalchemy.orm import Session
+import threading
+from typing import Any, List, Optional, Dict, Tuple
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session, raiseload
 from models.activity_category import ActivityCategory
 from .base_repository import BaseRepository
 
@@ -13,6 +15,9 @@ class ActivityCategoryRepository(BaseRepository[ActivityCategory]):
     def __init__(self):
         """Initialize repository with ActivityCategory model."""
         super().__init__(ActivityCategory)
+        # (version stamp, formatted text, categories dict) of the last categories loaded
+        self._categories_cache: Optional[Tuple[Any, str, Dict[int, Dict[str, any]]]] = None
+        self._cache_lock = threading.Lock()
     
     def get_all_categories(self, session: Session) -> List[ActivityCategory]:
         """
@@ -22,9 +27,9 @@ class ActivityCategoryRepository(BaseRepository[ActivityCategory]):
             session: Database session
             
         Returns:
-            List of all activity categories
+            List of all activity categories, whose activity lists raise if accessed
         """
-        return session.query(self.model_class).all()
+        return session.query(self.model_class).options(raiseload('*')).all()
     
     def get_categories_dict(self, session: Session) -> Dict[int, Dict[str, any]]:
         """
@@ -36,23 +41,7 @@ class ActivityCategoryRepository(BaseRepository[ActivityCategory]):
         Returns:
             Dictionary mapping category ID to category data
         """
-        categories = self.get_all_categories(session)
-        categories_dict = {}
-        
-        for category in categories:
-            categories_dict[category.id] = {
-                'id': category.id,
-                'name': category.name,
-                'description': category.description,
-                'calculation_type': category.calculation_type,
-                'hours_awarded': category.hours_awarded,
-                'input_unit': category.input_unit,
-                'input_quantity': category.input_quantity,
-                'output_hours': category.output_hours,
-                'max_total_hours': category.max_total_hours
-            }
-        
-        return categories_dict
+        return self.get_categories_text_and_dict(session)[1]
     
     def get_categories_formatted_text(self, session: Session) -> str:
         """
@@ -64,19 +53,49 @@ class ActivityCategoryRepository(BaseRepository[ActivityCategory]):
         Returns:
             Formatted categories text
         """
-        categories = self.get_all_categories(session)
+        return self.get_categories_text_and_dict(session)[0]
+    
+    def get_categories_text_and_dict(self, session: Session) -> Tuple[str, Dict[int, Dict[str, any]]]:
+        """
+        Get the prompt text and the category data dictionary.
         
-        if not categories:
-            return "No categories available"
+        Categories rarely change, so both are built once and reused until the
+        table's version stamp (row count and latest updated_at) changes. The
+        stamp is a single aggregate query; edits made outside the ORM must
+        set updated_at to be picked up.
         
-        categories_list = []
-        for category in categories:
-            category_info = f"ID: {category.id}, Name: {category.name}"
-            if category.description:
-                category_info += f", Description: {category.description}"
-            categories_list.append(category_info)
+        Args:
+            session: Database session
+            
+        Returns:
+            Tuple of (formatted categories text, category ID to category data)
+        """
+        stamp = tuple(session.query(
+            func.count(ActivityCategory.id), func.max(ActivityCategory.updated_at)
+        ).one())
         
-        return "\n".join(categories_list)
+        with self._cache_lock:
+            cached = self._categories_cache
+        if cached is not None and cached[0] == stamp:
+            return cached[1], cached[2]
+        
+        # Plain rows are enough for read-only category data; no ORM objects are built
+        rows = session.execute(select(
+            ActivityCategory.id,
+            ActivityCategory.name,
+            ActivityCategory.description,
+            ActivityCategory.calculation_type,
+            ActivityCategory.hours_awarded,
+            ActivityCategory.input_unit,
+            ActivityCategory.input_quantity,
+            ActivityCategory.output_hours,
+            ActivityCategory.max_total_hours
+        )).all()
+        categories_dict = {row.id: dict(row._mapping) for row in rows}
+        text = self._format_categories_text(list(categories_dict.values()))
+        with self._cache_lock:
+            self._categories_cache = (stamp, text, categories_dict)
+        return text, categories_dict
     
     def get_by_name(self, session: Session, name: str) -> Optional[ActivityCategory]:
         """
@@ -89,4 +108,19 @@ class ActivityCategoryRepository(BaseRepository[ActivityCategory]):
         Returns:
             ActivityCategory if found, None otherwise
         """
-        return session.query(self.model_class).filter(self.model_class.name == name).first()
\ No newline at end of file
+        return session.query(self.model_class).filter(self.model_class.name == name).first()
+    
+    @staticmethod
+    def _format_categories_text(categories: List[Dict[str, any]]) -> str:
+        """Format categories as one line per category for the LLM prompt."""
+        if not categories:
+            return "No categories available"
+        
+        categories_list = []
+        for category in categories:
+            category_info = f"ID: {category['id']}, Name: {category['name']}"
+            if category['description']:
+                category_info += f", Description: {category['description']}"
+            categories_list.append(category_info)
+        
+        return "\n".join(categories_list)
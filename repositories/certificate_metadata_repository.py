@@ -26,7 +26,8 @@ class CertificateMetadataRepository(BaseRepository[CertificateMetadata]):
         event_date: Optional[str] = None,
         original_hours: Optional[str] = None,
         numeric_hours: Optional[int] = None,
-        processing_time_ms: Optional[int] = None
+        processing_time_ms: Optional[int] = None,
+        text_sha256: Optional[str] = None
     ) -> CertificateMetadata:
         """
         Create certificate metadata record.
@@ -42,6 +43,7 @@ class CertificateMetadataRepository(BaseRepository[CertificateMetadata]):
             event_date=event_date,
             original_hours=original_hours,
             numeric_hours=numeric_hours,
+            text_sha256=text_sha256,
             processing_time_ms=processing_time_ms,
             extracted_at=datetime.now(timezone.utc)
         )
@@ -49,6 +51,26 @@ class CertificateMetadataRepository(BaseRepository[CertificateMetadata]):
         session.flush()
         return metadata
     
+    def get_latest_by_text_sha256(
+        self,
+        session: Session,
+        text_sha256: str
+    ) -> Optional[CertificateMetadata]:
+        """
+        Get the most recent metadata extracted from an identical OCR text.
+        
+        Args:
+            session: Database session
+            text_sha256: SHA-256 hex digest of the OCR text
+            
+        Returns:
+            Metadata instance with a participant name, or None if the text was never extracted
+        """
+        return session.query(CertificateMetadata).filter(
+            CertificateMetadata.text_sha256 == text_sha256,
+            CertificateMetadata.participant_name.isnot(None)
+        ).order_by(CertificateMetadata.extracted_at.desc()).first()
+    
     def get_by_submission_id(
         self, 
         session: Session, 
@@ -1,12 +1,13 @@
 """
 Certificate OCR text repository for database operations.
 """
-from typing import Optional
+from typing import Dict, List, Optional
 from datetime import datetime, timezone
 from sqlalchemy.orm import Session
 
 from repositories.base_repository import BaseRepository
 from models.certificate_ocr_text import CertificateOcrText
+from models.certificate_submission import CertificateSubmission
 
 
 class CertificateOcrTextRepository(BaseRepository[CertificateOcrText]):
@@ -48,6 +49,26 @@ class CertificateOcrTextRepository(BaseRepository[CertificateOcrText]):
         session.flush()
         return ocr_text
     
+    def get_raw_texts(
+        self,
+        session: Session,
+        ocr_text_ids: List[int]
+    ) -> Dict[int, str]:
+        """
+        Get the raw text of several OCR records with one query.
+        
+        Args:
+            session: Database session
+            ocr_text_ids: OCR text IDs
+            
+        Returns:
+            Raw text by OCR text ID, missing IDs are left out
+        """
+        rows = session.query(CertificateOcrText.id, CertificateOcrText.raw_text).filter(
+            CertificateOcrText.id.in_(ocr_text_ids)
+        ).all()
+        return {ocr_text_id: raw_text for ocr_text_id, raw_text in rows}
+    
     def get_by_submission_id(
         self, 
         session: Session, 
@@ -65,4 +86,30 @@ class CertificateOcrTextRepository(BaseRepository[CertificateOcrText]):
         """
         return session.query(CertificateOcrText).filter_by(
             submission_id=submission_id
-        ).first()
\ No newline at end of file
+        ).first()
+    
+    def get_latest_by_file_checksum(
+        self,
+        session: Session,
+        file_checksum: str,
+        exclude_submission_id: Optional[int] = None
+    ) -> Optional[CertificateOcrText]:
+        """
+        Get the most recent OCR text extracted from a file with the given checksum.
+        
+        Args:
+            session: Database session
+            file_checksum: SHA-256 checksum of the uploaded file
+            exclude_submission_id: Submission to ignore (usually the one being processed)
+            
+        Returns:
+            OCR text instance or None if the file was never processed
+        """
+        query = session.query(CertificateOcrText).join(
+            CertificateSubmission, CertificateOcrText.submission_id == CertificateSubmission.id
+        ).filter(CertificateSubmission.file_checksum == file_checksum)
+        
+        if exclude_submission_id is not None:
+            query = query.filter(CertificateOcrText.submission_id != exclude_submission_id)
+        
+        return query.order_by(CertificateOcrText.extracted_at.desc()).first()
@@ -3,12 +3,13 @@ Certificate submission repository for database operations.
 """
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timezone
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session, joinedload, raiseload, selectinload
+from sqlalchemy import and_, or_, func
 
 from repositories.base_repository import BaseRepository
 from models.certificate_submission import CertificateSubmission
 from models.student import Student
+from models.extracted_activity import ExtractedActivity
 
 
 class CertificateSubmissionRepository(BaseRepository[CertificateSubmission]):
@@ -59,6 +60,32 @@ class CertificateSubmissionRepository(BaseRepository[CertificateSubmission]):
         session.flush()
         return submission
     
+    def get_for_processing(
+        self,
+        session: Session,
+        submission_id: int,
+        load_ocr_text: bool = True
+    ) -> Optional[CertificateSubmission]:
+        """
+        Get submission with the student, and optionally the OCR text, a pipeline consumer reads.
+        
+        Both are to-one relationships, so they are joined into the same SELECT
+        instead of being lazy-loaded by one query each.
+        
+        Args:
+            session: Database session
+            submission_id: Submission ID
+            load_ocr_text: Also join the OCR text; consumers that never read
+                submission.ocr_text skip its raw_text column
+            
+        Returns:
+            Submission instance with student (and OCR text) loaded, or None if not found
+        """
+        options = [joinedload(CertificateSubmission.student)]
+        if load_ocr_text:
+            options.append(joinedload(CertificateSubmission.ocr_text))
+        return session.get(CertificateSubmission, submission_id, options=options)
+    
     def get_by_checksum(
         self, 
         session: Session, 
@@ -94,6 +121,11 @@ class CertificateSubmissionRepository(BaseRepository[CertificateSubmission]):
         """
         Get submissions by student ID with optional status filter.
         
+        Activities (with their final category) are loaded for the whole list,
+        without the LLM reasoning and coordinator comments the list does not
+        show; any other relationship raises instead of issuing a query per
+        submission.
+        
         Args:
             session: Database session
             student_id: Student ID
@@ -104,7 +136,14 @@ class CertificateSubmissionRepository(BaseRepository[CertificateSubmission]):
         Returns:
             List of submission instances
         """
-        query = session.query(CertificateSubmission).filter_by(
+        query = session.query(CertificateSubmission).options(
+            selectinload(CertificateSubmission.activities).defer(
+                ExtractedActivity.llm_reasoning
+            ).defer(
+                ExtractedActivity.coordinator_comments
+            ).selectinload(ExtractedActivity.final_category),
+            raiseload('*')
+        ).filter_by(
             student_id=student_id
         )
         
@@ -127,6 +166,9 @@ class CertificateSubmissionRepository(BaseRepository[CertificateSubmission]):
         """
         Update submission status and optional error message with timestamp tracking.
         
+        Changes are not flushed here: successive status changes within one
+        transaction are written by a single UPDATE at the next flush or commit.
+        
         Args:
             session: Database session
             submission_id: Submission ID
@@ -138,9 +180,8 @@ class CertificateSubmissionRepository(BaseRepository[CertificateSubmission]):
         Returns:
             Updated submission instance or None if not found
         """
-        from datetime import datetime, timezone
-        
-        submission = self.get_by_id(session, submission_id)
+        # Served from the identity map when the caller already loaded the submission
+        submission = session.get(CertificateSubmission, submission_id)
         
         if submission:
             submission.status = status
@@ -153,8 +194,6 @@ class CertificateSubmissionRepository(BaseRepository[CertificateSubmission]):
                 submission.processing_started_at = current_time
             if update_processing_completed:
                 submission.processing_completed_at = current_time
-            
-            session.flush()
         
         return submission
     
@@ -169,6 +208,11 @@ class CertificateSubmissionRepository(BaseRepository[CertificateSubmission]):
         """
         Get pending submissions with pagination and optional filters.
         
+        The student, metadata and activities (with their category) of the page
+        are loaded by one query per relationship instead of one per submission;
+        any other relationship raises instead of being lazy-loaded row by row.
+        Activity text columns the page does not show are left out of the SELECT.
+        
         Args:
             session: Database session
             status: Status filter
@@ -186,12 +230,21 @@ class CertificateSubmissionRepository(BaseRepository[CertificateSubmission]):
                 Student.enrollment_number.ilike(f'%{enrollment_filter}%')
             )
         
-        # Get total count
-        total = query.count()
+        # Count ids directly instead of wrapping the full entity query in a subquery
+        total = query.with_entities(func.count(CertificateSubmission.id)).scalar()
         
         # Apply pagination
         offset = (page - 1) * per_page
-        submissions = query.order_by(
+        submissions = query.options(
+            selectinload(CertificateSubmission.student),
+            selectinload(CertificateSubmission.certificate_metadata),
+            selectinload(CertificateSubmission.activities).defer(
+                ExtractedActivity.override_reasoning
+            ).defer(
+                ExtractedActivity.coordinator_comments
+            ).selectinload(ExtractedActivity.category),
+            raiseload('*')
+        ).order_by(
             CertificateSubmission.submitted_at.desc()
         ).offset(offset).limit(per_page).all()
         
@@ -4,11 +4,9 @@ Certificate extraction routes.
 from flask import Blueprint, request, jsonify
 from werkzeug.utils import secure_filename
 import logging
-from typing import Dict, Any
+import threading
 from injector import inject
 
-from services.ocr_service import OCRService
-from services.certificate_service import CertificateService
 from services.certificate_submission_service import CertificateSubmissionService
 import config.settings as settings
 
@@ -16,6 +14,9 @@ logger = logging.getLogger(__name__)
 
 certificate_bp = Blueprint('certificate', __name__, url_prefix='/api/v1/certificate')
 
+# Bounds uploads parsed, spooled and forwarded to S3/Kafka at once by this process
+_submission_slots = threading.BoundedSemaphore(settings.MAX_CONCURRENT_SUBMISSIONS)
+
 
 def allowed_file(filename: str) -> bool:
     """Check if the file extension is allowed."""
@@ -41,62 +42,82 @@ def submit_certificate(certificate_submission_service: CertificateSubmissionServ
     Returns:
         JSON with submission details and tracking ID
     """
-    try:
-        # Validate request data
-        if 'file' not in request.files:
-            return jsonify({'error': 'No file provided'}), 400
-        
-        if 'enrollment_number' not in request.form:
-            return jsonify({'error': 'Enrollment number is required'}), 400
-        
-        file = request.files['file']
-        enrollment_number = request.form['enrollment_number'].strip()
-        
-        if file.filename == '':
-            return jsonify({'error': 'No file selected'}), 400
-        
-        if not enrollment_number:
-            return jsonify({'error': 'Enrollment number cannot be empty'}), 400
-        
-        if not allowed_file(file.filename):
-            return jsonify({
-                'error': f'File type not allowed. Allowed types: {settings.ALLOWED_EXTENSIONS}'
-            }), 400
-        
-        # Read file content
-        file_content = file.read()
-        original_filename = secure_filename(file.filename)
-        mime_type = file.mimetype or 'application/octet-stream'
-        
-        logger.info(f"Submitting certificate: {original_filename} for {enrollment_number}")
-        
-        # Delegate to service layer
-        success, result = certificate_submission_service.submit_certificate(
-            file_content=file_content,
-            original_filename=original_filename,
-            enrollment_number=enrollment_number,
-            mime_type=mime_type
-        )
-        
-        if success:
-            return jsonify({
-                'success': True,
-                **result
-            }), 201
-        else:
-            # Check if it's a duplicate error (409) or other error (400/500)
-            if result.get('error') == 'Duplicate file detected':
-                return jsonify(result), 409
-            elif 'Failed to queue file for processing' in result.get('error', ''):
-                return jsonify(result), 500
-            else:
-                return jsonify(result), 400
+    # Taken before request.files is first read: that parses and spools the whole upload
+    if not _submission_slots.acquire(timeout=settings.SUBMISSION_QUEUE_TIMEOUT):
+        logger.warning("Rejecting certificate submission, too many uploads in progress")
+        response = jsonify({'error': 'Too many submissions in progress, try again later'})
+        response.headers['Retry-After'] = str(max(1, int(settings.SUBMISSION_QUEUE_TIMEOUT)))
+        return response, 429
     
+    try:
+        return _submit_certificate(certificate_submission_service)
     except Exception as e:
         logger.error(f"Unexpected error in submit_certificate: {e}")
         return jsonify({
             'error': 'Internal server error'
         }), 500
+    finally:
+        _submission_slots.release()
+
+
+def _submit_certificate(certificate_submission_service: CertificateSubmissionService):
+    """
+    Validate the upload and submit it, holding a submission slot.
+    
+    Args:
+        certificate_submission_service: Service performing the submission
+        
+    Returns:
+        Flask response and status code
+    """
+    # Validate request data
+    if 'file' not in request.files:
+        return jsonify({'error': 'No file provided'}), 400
+    
+    if 'enrollment_number' not in request.form:
+        return jsonify({'error': 'Enrollment number is required'}), 400
+    
+    file = request.files['file']
+    enrollment_number = request.form['enrollment_number'].strip()
+    
+    if file.filename == '':
+        return jsonify({'error': 'No file selected'}), 400
+    
+    if not enrollment_number:
+        return jsonify({'error': 'Enrollment number cannot be empty'}), 400
+    
+    if not allowed_file(file.filename):
+        return jsonify({
+            'error': f'File type not allowed. Allowed types: {settings.ALLOWED_EXTENSIONS}'
+        }), 400
+    
+    # Uploads are spooled to disk by Werkzeug; hand the stream on instead of reading it into memory
+    original_filename = secure_filename(file.filename)
+    mime_type = file.mimetype or 'application/octet-stream'
+    
+    logger.info(f"Submitting certificate: {original_filename} for {enrollment_number}")
+    
+    # Delegate to service layer
+    success, result = certificate_submission_service.submit_certificate(
+        file_stream=file.stream,
+        original_filename=original_filename,
+        enrollment_number=enrollment_number,
+        mime_type=mime_type
+    )
+    
+    if success:
+        return jsonify({
+            'success': True,
+            **result
+        }), 201
+    
+    # Check if it's a duplicate error (409) or other error (400/500)
+    if result.get('error') == 'Duplicate file detected':
+        return jsonify(result), 409
+    elif 'Failed to queue file for processing' in result.get('error', ''):
+        return jsonify(result), 500
+    else:
+        return jsonify(result), 400
 
 
 @certificate_bp.route('/status/<int:submission_id>', methods=['GET'])
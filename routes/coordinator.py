@@ -25,10 +25,6 @@ coordinator_bp = Blueprint('coordinator', __name__, url_prefix='/api/v1/coordina
 @inject
 def get_pending_submissions(
     submission_repository: CertificateSubmissionRepository,
-    student_repository: StudentRepository,
-    ocr_text_repository: CertificateOcrTextRepository,
-    metadata_repository: CertificateMetadataRepository,
-    activity_repository: ExtractedActivityRepository,
     s3_service: S3Service
 ):
     """
@@ -62,14 +58,10 @@ def get_pending_submissions(
             # Build response
             results = []
             for submission in submissions:
-                # Get student info
-                student = student_repository.get_by_id(session, submission.student_id)
-                
-                # Get metadata
-                metadata = metadata_repository.get_by_submission_id(session, submission.id)
-                
-                # Get extracted activity
-                activity = activity_repository.get_by_submission_id(session, submission.id)
+                # Related rows were loaded along with the page of submissions
+                student = submission.student
+                metadata = submission.certificate_metadata[0] if submission.certificate_metadata else None
+                activity = submission.activities[0] if submission.activities else None
                 
                 submission_data = {
                     'submission_id': submission.id,
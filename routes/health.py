@@ -2,7 +2,6 @@
 Health check routes for the application.
 """
 from flask import Blueprint, jsonify
-import requests
 import logging
 from injector import inject
 
@@ -18,22 +17,9 @@ health_bp = Blueprint('health', __name__, url_prefix='/api/v1')
 @inject
 def health_check(llm_service: LLMService):
     """Health check endpoint."""
-    # Check Ollama and model availability in real time
+    # Ollama and model availability, probed at most once per OLLAMA_STATUS_TTL
     ollama_status = llm_service.test_connection()
-    model_status = False
-    
-    if ollama_status:
-        try:
-            response = requests.get(
-                f"{settings.OLLAMA_BASE_URL}/api/tags", 
-                timeout=settings.OLLAMA_CONNECTION_TIMEOUT
-            )
-            if response.status_code == 200:
-                models = response.json().get('models', [])
-                model_names = [model.get('name', '') for model in models]
-                model_status = settings.OLLAMA_MODEL in model_names
-        except:
-            pass
+    model_status = ollama_status and llm_service.is_model_available()
     
     return jsonify({
         "status": "healthy",
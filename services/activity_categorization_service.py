@@ -2,8 +2,8 @@
 Activity categorization service using LLM for intelligent category matching.
 """
 import re
-import json
 import logging
+import orjson
 from typing import Dict, Any, List, Optional
 from models.activity_category import ActivityCategory
 from models.extracted_activity import ExtractedActivity
@@ -12,9 +12,42 @@ from repositories.activity_category_repository import ActivityCategoryRepository
 from database.connection import get_db_session
 from services.llm_service import LLMService
 from services.prompt_service import PromptService
+import config.settings as settings
 
 logger = logging.getLogger(__name__)
 
+# Patterns for quantities mentioned in extracted fields, in order of preference
+DAYS_PATTERNS = [
+    re.compile(r'(\d+)\s*dias?'),
+    re.compile(r'(\d+)\s*days?')
+]
+PAGES_PATTERNS = [
+    re.compile(r'(\d+)\s*páginas?'),
+    re.compile(r'(\d+)\s*pages?'),
+    re.compile(r'(\d+)\s*p\.'),
+    re.compile(r'(\d+)\s*pgs?')
+]
+
+# "40h", "20 horas", "40hr"; any number is used when no unit is present
+HOURS_RE = re.compile(r'(\d+)\s*h')
+NUMBER_RE = re.compile(r'(\d+)')
+
+# Programs whose wording alone determines the category, so the LLM is not needed;
+# group name -> category name as seeded in database/init.sql. Accents are optional
+# since OCR often drops them.
+KEYWORD_CATEGORIES = {
+    'scientific_initiation': 'Programa de iniciação científica ou tecnológica',
+    'teaching_initiation': 'Programa de iniciação a docência',
+    'monitoring': 'Programa de monitoria',
+    'research_project': 'Projeto de pesquisa ou extensão',
+}
+KEYWORD_CATEGORY_RE = re.compile(
+    r'(?P<scientific_initiation>inicia[çc][ãa]o (?:cient[íi]fica|tecnol[óo]gica)|\bpibic\b|\bpibiti\b)'
+    r'|(?P<teaching_initiation>inicia[çc][ãa]o [àa] doc[êe]ncia|\bpibid\b)'
+    r'|(?P<monitoring>\bmonitoria\b)'
+    r'|(?P<research_project>projeto de (?:pesquisa|extens[ãa]o))'
+)
+
 
 class ActivityCategorizationService:
     """Service for categorizing extracted activities using LLM and calculating valid hours."""
@@ -32,13 +65,19 @@ class ActivityCategorizationService:
         self.activity_repository = activity_repository
         self.category_repository = category_repository
     
-    def categorize_activity(self, extracted_data: Dict[str, Any], submission_id: int = None) -> Dict[str, Any]:
+    def categorize_activity(
+        self,
+        extracted_data: Dict[str, Any],
+        submission_id: int = None,
+        categorization: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
         """
         Categorize an extracted activity using LLM and calculate valid hours.
         
         Args:
             extracted_data: Dictionary with extracted certificate data
             submission_id: ID of the certificate submission (for database persistence)
+            categorization: Category the LLM already chose while extracting, if any
             
         Returns:
             Dictionary with categorization results
@@ -57,7 +96,7 @@ class ActivityCategorizationService:
         # Use LLM to identify category with timing
         import time
         start_time = time.time()
-        category_data, llm_reasoning = self._categorize_with_llm(extracted_data)
+        category_data, llm_reasoning = self._categorize_with_llm(extracted_data, categorization)
         end_time = time.time()
         processing_time_ms = int((end_time - start_time) * 1000)
         
@@ -85,12 +124,17 @@ class ActivityCategorizationService:
             'extracted_activity_id': extracted_activity_id
         }
     
-    def _categorize_with_llm(self, extracted_data: Dict[str, Any]) -> tuple[Optional[Dict[str, Any]], str]:
+    def _categorize_with_llm(
+        self,
+        extracted_data: Dict[str, Any],
+        categorization: Optional[Dict[str, Any]] = None
+    ) -> tuple[Optional[Dict[str, Any]], str]:
         """
         Use LLM to categorize the activity.
         
         Args:
             extracted_data: Extracted certificate data
+            categorization: LLM response already obtained along with the extraction, if any
             
         Returns:
             Tuple of (category_data_dict, reasoning)
@@ -99,11 +143,16 @@ class ActivityCategorizationService:
             # Get all available categories (both formatted text and category data dict)
             categories_text, categories_dict = self._get_categories_text()
             
+            if settings.KEYWORD_CATEGORIZATION:
+                keyword_result = self._categorize_by_keywords(extracted_data, categories_dict)
+                if keyword_result:
+                    return keyword_result
+            
             # Get raw OCR text
             raw_text = extracted_data.get('raw_text', '')
             
-            # Get LLM response using proper prompt service
-            response = self.llm_service.categorize_activity(
+            # Get LLM response using proper prompt service, unless it came with the extraction
+            response = categorization or self.llm_service.categorize_activity(
                 raw_text=raw_text,
                 extracted_data=extracted_data,
                 categories_text=categories_text
@@ -127,6 +176,51 @@ class ActivityCategorizationService:
             logger.error(f"Error in LLM categorization: {e}")
             return None, f"LLM error: {str(e)}"
     
+    def _categorize_by_keywords(
+        self,
+        extracted_data: Dict[str, Any],
+        categories_dict: Dict[int, Dict[str, Any]]
+    ) -> Optional[tuple[Dict[str, Any], str]]:
+        """
+        Categorize certificates of programs named explicitly in their event title.
+        
+        Only the title (evento) is matched: the body of short courses often
+        mentions the project or program promoting them. The title must name
+        exactly one program and the certificate must cover at least the hours
+        the category awards, anything else is left to the LLM.
+        
+        Args:
+            extracted_data: Extracted certificate data
+            categories_dict: Category ID to category data
+            
+        Returns:
+            Tuple of (category_data_dict, reasoning), or None if the LLM is needed
+        """
+        evento = (extracted_data.get('evento') or '').lower()
+        matches = {match.lastgroup: match.group() for match in KEYWORD_CATEGORY_RE.finditer(evento)}
+        if len(matches) != 1:
+            return None
+        
+        ((group, keyword),) = matches.items()
+        category_name = KEYWORD_CATEGORIES[group]
+        category_data = next(
+            (category for category in categories_dict.values() if category['name'] == category_name), None
+        )
+        if not category_data:
+            return None
+        
+        # A few hours of a course promoted by a program are not the program itself
+        numeric_hours = self._extract_numeric_hours(extracted_data.get('carga_horaria', ''))
+        if numeric_hours is None or numeric_hours < (category_data['hours_awarded'] or 0):
+            logger.info(
+                f"Keyword '{keyword}' found but {numeric_hours}h is below the "
+                f"{category_data['hours_awarded']}h of '{category_name}', using LLM"
+            )
+            return None
+        
+        logger.info(f"Categorized by keyword '{keyword}' as '{category_name}', skipping LLM")
+        return category_data, f"Categoria definida pela palavra-chave '{keyword}' no título do evento"
+    
     def _build_categorization_prompt(self, extracted_data: Dict[str, Any], categories: List[ActivityCategory]) -> str:
         """Build prompt for LLM categorization using prompt service."""
         
@@ -150,8 +244,7 @@ class ActivityCategorizationService:
             evento=extracted_data.get('evento', 'N/A'),
             local=extracted_data.get('local', 'N/A'),
             data=extracted_data.get('data', 'N/A'),
-            carga_horaria=extracted_data.get('carga_horaria', 'N/A'),
-            categories_text=categories_text
+            carga_horaria=extracted_data.get('carga_horaria', 'N/A')
         )
     
     def _parse_llm_response(self, response: str) -> tuple[Optional[int], str]:
@@ -163,7 +256,7 @@ class ActivityCategorizationService:
             
             if json_start >= 0 and json_end > json_start:
                 json_str = response[json_start:json_end]
-                parsed = json.loads(json_str)
+                parsed = orjson.loads(json_str)
                 
                 category_id = parsed.get('category_id')
                 reasoning = parsed.get('reasoning', 'No reasoning provided')
@@ -172,7 +265,7 @@ class ActivityCategorizationService:
             
             return None, f"Could not parse JSON from response: {response}"
             
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:
             logger.error(f"JSON parsing error: {e}")
             return None, f"JSON parsing error: {response}"
     
@@ -241,13 +334,9 @@ class ActivityCategorizationService:
         for text in text_fields:
             if text:
                 # Look for patterns like "3 dias", "2 days", etc.
-                patterns = [
-                    r'(\d+)\s*dias?',
-                    r'(\d+)\s*days?'
-                ]
-                
-                for pattern in patterns:
-                    match = re.search(pattern, text.lower())
+                text_lower = text.lower()
+                for pattern in DAYS_PATTERNS:
+                    match = pattern.search(text_lower)
                     if match:
                         return int(match.group(1))
         
@@ -264,15 +353,9 @@ class ActivityCategorizationService:
         for text in text_fields:
             if text:
                 # Look for patterns like "10 páginas", "15 pages", etc.
-                patterns = [
-                    r'(\d+)\s*páginas?',
-                    r'(\d+)\s*pages?',
-                    r'(\d+)\s*p\.',
-                    r'(\d+)\s*pgs?'
-                ]
-                
-                for pattern in patterns:
-                    match = re.search(pattern, text.lower())
+                text_lower = text.lower()
+                for pattern in PAGES_PATTERNS:
+                    match = pattern.search(text_lower)
                     if match:
                         return int(match.group(1))
         
@@ -291,25 +374,10 @@ class ActivityCategorizationService:
         if not carga_horaria:
             return None
         
-        # Common patterns for hours
-        patterns = [
-            r'(\d+)\s*h',  # "40h", "20 h"
-            r'(\d+)\s*hora',  # "40 horas", "20 hora"
-            r'(\d+)\s*hr',  # "40hr", "20 hrs"
-            r'(\d+)(?:\s*|$)',  # Just numbers at end or followed by space
-        ]
-        
         carga_lower = carga_horaria.lower().strip()
         
-        for pattern in patterns:
-            match = re.search(pattern, carga_lower)
-            if match:
-                try:
-                    return int(match.group(1))
-                except ValueError:
-                    continue
-        
-        return None
+        match = HOURS_RE.search(carga_lower) or NUMBER_RE.search(carga_lower)
+        return int(match.group(1)) if match else None
     
     def _save_extracted_activity(
         self, 
@@ -456,11 +524,8 @@ class ActivityCategorizationService:
         """
         try:
             with get_db_session() as session:
-                # Use repository to get formatted text and data dict
-                categories_text = self.category_repository.get_categories_formatted_text(session)
-                categories_dict = self.category_repository.get_categories_dict(session)
-                
-                return categories_text, categories_dict
+                # Built once and reused until the categories table changes
+                return self.category_repository.get_categories_text_and_dict(session)
                 
         except Exception as e:
             logger.error(f"Error getting categories: {e}")
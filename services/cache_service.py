@@ -0,0 +1,245 @@
+"""
+Cache service for reusing results of expensive, deterministic operations.
+"""
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import orjson
+
+import config.settings as settings
+
+logger = logging.getLogger(__name__)
+
+# OCR noise that does not change the content of a document: punctuation, symbols, spacing
+_NOISE_RE = re.compile(r'[\W_]+')
+
+
+class CacheService:
+    """Thread-safe LRU cache keyed by content hashes, optionally backed by a directory."""
+
+    def __init__(
+        self,
+        max_entries: int = settings.LLM_CACHE_SIZE,
+        cache_dir: Optional[str] = settings.LLM_CACHE_DIR
+    ):
+        """
+        Initialize cache service.
+
+        Args:
+            max_entries: Maximum number of cached entries in memory (0 disables caching)
+            cache_dir: Directory where entries are also stored as JSON files, None for memory only
+        """
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir if max_entries > 0 else None
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        # Per scope: matrix of unit-length embeddings (one row per entry) and their values
+        self._similar: Dict[str, Tuple[np.ndarray, List[Any]]] = {}
+
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            logger.info(f"Persisting cache entries to {self.cache_dir}")
+
+    @staticmethod
+    def make_key(*parts: str) -> str:
+        """
+        Build a cache key from the SHA-256 of the given parts.
+
+        Args:
+            *parts: Strings identifying the cached value (model, input text, ...)
+
+        Returns:
+            Hex digest usable as cache key
+        """
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\x1f')
+        return digest.hexdigest()
+
+    @staticmethod
+    def fingerprint_text(text: str) -> str:
+        """
+        Normalize OCR text so scans that differ only in noise share a cache key.
+
+        Case, punctuation, stray symbols and whitespace are the parts of the
+        output Tesseract varies most between scans of the same document, so
+        only the sequence of words is kept.
+
+        Args:
+            text: OCR extracted text
+
+        Returns:
+            Lower-cased words of the text separated by single spaces
+        """
+        return _NOISE_RE.sub(' ', text.lower()).strip()
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Get cached value and mark it as recently used.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Cached value or None if not cached
+        """
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                return value
+
+        value = self._read_entry(key)
+        if value is not None:
+            self._remember(key, value)
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        """
+        Store value, evicting the least recently used entry when full.
+
+        Args:
+            key: Cache key
+            value: Value to cache
+        """
+        if self.max_entries <= 0 or value is None:
+            return
+
+        self._remember(key, value)
+        self._write_entry(key, value)
+
+    def _remember(self, key: str, value: Any) -> None:
+        """Store value in memory, evicting the least recently used entry when full."""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _entry_path(self, key: str) -> str:
+        """Get the file holding an entry, sharded by key prefix to keep directories small."""
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _read_entry(self, key: str) -> Optional[Any]:
+        """
+        Load an entry persisted by a previous process.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Cached value or None if not persisted or unreadable
+        """
+        if not self.cache_dir:
+            return None
+
+        try:
+            with open(self._entry_path(key), 'rb') as entry_file:
+                return orjson.loads(entry_file.read()).get('value')
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable cache entry {key}: {e}")
+            return None
+
+    def _write_entry(self, key: str, value: Any) -> None:
+        """
+        Persist an entry atomically so concurrent readers never see partial files.
+
+        Args:
+            key: Cache key
+            value: JSON-serializable value
+        """
+        if not self.cache_dir:
+            return
+
+        path = self._entry_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            entry = {'cached_at': datetime.now(timezone.utc).isoformat(), 'value': value}
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'wb') as entry_file:
+                entry_file.write(orjson.dumps(entry))
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"Failed to persist cache entry {key}: {e}")
+
+    @staticmethod
+    def _unit_vector(embedding: Sequence[float]) -> Optional[np.ndarray]:
+        """Convert an embedding to a float32 unit vector, None for a zero vector."""
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def get_similar(
+        self,
+        scope: str,
+        embedding: Sequence[float],
+        threshold: float = settings.SEMANTIC_CACHE_THRESHOLD
+    ) -> Optional[Any]:
+        """
+        Get the value cached for the most similar embedding.
+
+        Args:
+            scope: Namespace the value must have been stored under (model, prompt version, ...)
+            embedding: Embedding of the input being looked up
+            threshold: Minimum cosine similarity for a match
+
+        Returns:
+            Cached value or None if no stored embedding is similar enough
+        """
+        vector = self._unit_vector(embedding)
+        if vector is None:
+            return None
+
+        with self._lock:
+            matrix, values = self._similar.get(scope, (None, None))
+            if matrix is None or matrix.shape[1] != vector.shape[0]:
+                return None
+
+            similarities = matrix @ vector
+            best = int(similarities.argmax())
+            if similarities[best] < threshold:
+                return None
+
+            logger.debug(f"Similar cache entry found (cosine {similarities[best]:.4f})")
+            return values[best]
+
+    def set_similar(self, scope: str, embedding: Sequence[float], value: Any) -> None:
+        """
+        Store value under an embedding, dropping the oldest entry of the scope when full.
+
+        Args:
+            scope: Namespace of the value
+            embedding: Embedding of the input the value was computed from
+            value: Value to cache
+        """
+        vector = self._unit_vector(embedding)
+        if self.max_entries <= 0 or value is None or vector is None:
+            return
+
+        with self._lock:
+            matrix, values = self._similar.get(scope, (None, []))
+            if matrix is None or matrix.shape[1] != vector.shape[0]:
+                matrix, values = vector[np.newaxis, :], [value]
+            else:
+                overflow = max(0, len(values) + 1 - self.max_entries)
+                matrix = np.vstack((matrix[overflow:], vector))
+                values = values[overflow:] + [value]
+            self._similar[scope] = (matrix, values)
+
+    def clear(self) -> None:
+        """Remove all entries cached in memory."""
+        with self._lock:
+            self._entries.clear()
+            self._similar.clear()
+        logger.info("Cache cleared")
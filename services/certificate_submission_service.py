@@ -2,13 +2,12 @@
 Certificate Submission Service for handling async certificate processing workflow.
 """
 import logging
-from typing import Dict, Any, Optional, Tuple
+from typing import Dict, Any, BinaryIO, Optional, Tuple
 from injector import inject
 
 from database.connection import get_db_session
 from services.student_service import StudentService
 from repositories.certificate_submission_repository import CertificateSubmissionRepository
-from repositories.activity_category_repository import ActivityCategoryRepository
 from services.s3_service import S3Service
 from services.kafka_service import KafkaService
 
@@ -24,19 +23,17 @@ class CertificateSubmissionService:
         s3_service: S3Service, 
         kafka_service: KafkaService,
         student_service: StudentService,
-        submission_repository: CertificateSubmissionRepository,
-        activity_category_repository: ActivityCategoryRepository
+        submission_repository: CertificateSubmissionRepository
     ):
         """Initialize certificate submission service."""
         self.s3_service = s3_service
         self.kafka_service = kafka_service
         self.student_service = student_service
         self.submission_repository = submission_repository
-        self.activity_category_repository = activity_category_repository
     
     def submit_certificate(
         self, 
-        file_content: bytes,
+        file_stream: BinaryIO,
         original_filename: str,
         enrollment_number: str,
         mime_type: str
@@ -45,7 +42,7 @@ class CertificateSubmissionService:
         Submit certificate for async processing.
         
         Args:
-            file_content: Binary content of the uploaded file
+            file_stream: Seekable binary stream of the uploaded file
             original_filename: Original filename of the uploaded file
             enrollment_number: Student enrollment number
             mime_type: MIME type of the file
@@ -54,8 +51,8 @@ class CertificateSubmissionService:
             Tuple of (success, response_data)
         """
         try:
-            # Calculate file checksum for duplicate detection
-            checksum = self.s3_service.calculate_checksum(file_content)
+            # Calculate file checksum for duplicate detection, streaming the upload
+            checksum, file_size = self.s3_service.calculate_stream_checksum(file_stream)
             
             with get_db_session() as session:
                 # Validate student exists (don't create new students)
@@ -84,7 +81,7 @@ class CertificateSubmissionService:
                 
                 # Upload file to S3
                 s3_result = self.s3_service.upload_file(
-                    file_content=file_content,
+                    file_content=file_stream,
                     enrollment_number=enrollment_number,
                     filename=original_filename,
                     checksum=checksum
@@ -102,14 +99,9 @@ class CertificateSubmissionService:
                     original_filename=original_filename,
                     s3_key=s3_key,
                     file_checksum=checksum,
-                    file_size=len(file_content),
+                    file_size=file_size,
                     mime_type=mime_type,
-                    status='uploaded'
-                )
-                
-                # Update submission status to queued
-                self.submission_repository.update_status(
-                    session, submission.id, 'queued'
+                    status='queued'  # Published for processing once committed
                 )
                 
                 # Store submission data for Kafka publishing after commit
@@ -119,7 +111,7 @@ class CertificateSubmissionService:
                     's3_key': s3_key,
                     'checksum': checksum,
                     'original_filename': original_filename,
-                    'file_size': len(file_content),
+                    'file_size': file_size,
                     'submitted_at': submission.submitted_at.isoformat()
                 }
                 
@@ -264,12 +256,9 @@ class CertificateSubmissionService:
                         if activity.final_hours is not None:
                             submission_data['final_hours'] = activity.final_hours
                         
-                        if activity.final_category_id:
-                            category = self.activity_category_repository.get_by_id(
-                                session, activity.final_category_id
-                            )
-                            if category:
-                                submission_data['category_name'] = category.name
+                        # Loaded along with the activities of the list
+                        if activity.final_category:
+                            submission_data['category_name'] = activity.final_category.name
                         
                         # Include override reasoning if coordinator made changes
                         if activity.override_reasoning:
@@ -1,9 +1,9 @@
 """
 Kafka Service for handling message publishing to Kafka topics.
 """
-import json
 import logging
 from typing import Dict, Any, Optional
+import orjson
 from kafka import KafkaProducer
 from kafka.errors import KafkaError
 import config.settings as settings
@@ -25,9 +25,14 @@ class KafkaService:
         try:
             self.producer = KafkaProducer(
                 bootstrap_servers=self.bootstrap_servers,
-                value_serializer=lambda x: json.dumps(x).encode('utf-8'),
+                value_serializer=orjson.dumps,  # UTF-8 bytes directly, no \u escapes for accented text
                 key_serializer=lambda x: x.encode('utf-8') if x else None,
                 acks='all',  # Wait for all replicas to acknowledge
+                # Publishes from concurrent consumer threads within linger_ms go out
+                # as one compressed request
+                compression_type=settings.KAFKA_COMPRESSION_TYPE,
+                linger_ms=settings.KAFKA_LINGER_MS,
+                batch_size=settings.KAFKA_BATCH_SIZE,
                 retries=3,
                 retry_backoff_ms=1000,
                 request_timeout_ms=30000
@@ -78,16 +83,17 @@ class KafkaService:
         self,
         submission_id: int,
         ocr_text_id: int,
-        raw_text: str,
         ocr_confidence: Optional[float] = None
     ) -> bool:
         """
         Publish message to certificate.ocr topic.
         
+        The OCR text itself is not sent: it can be tens of KB per document and
+        the OCR consumer reads it from the database by ocr_text_id.
+        
         Args:
             submission_id: Database ID of certificate submission
             ocr_text_id: Database ID of OCR text record
-            raw_text: Extracted text from OCR
             ocr_confidence: OCR confidence score
             
         Returns:
@@ -96,7 +102,6 @@ class KafkaService:
         message = {
             'submission_id': submission_id,
             'ocr_text_id': ocr_text_id,
-            'raw_text': raw_text,
             'ocr_confidence': ocr_confidence,
             'stage': 'ocr_completed',
             'timestamp': self._get_timestamp()
@@ -112,7 +117,8 @@ class KafkaService:
         self,
         submission_id: int,
         metadata_id: int,
-        extracted_data: Dict[str, Any]
+        extracted_data: Dict[str, Any],
+        categorization: Optional[Dict[str, Any]] = None
     ) -> bool:
         """
         Publish message to certificate.metadata topic.
@@ -121,6 +127,7 @@ class KafkaService:
             submission_id: Database ID of certificate submission
             metadata_id: Database ID of metadata record
             extracted_data: Extracted metadata
+            categorization: Category already chosen by the LLM along with the extraction
             
         Returns:
             True if published successfully, False otherwise
@@ -129,6 +136,7 @@ class KafkaService:
             'submission_id': submission_id,
             'metadata_id': metadata_id,
             'extracted_data': extracted_data,
+            'categorization': categorization,
             'stage': 'metadata_extracted',
             'timestamp': self._get_timestamp()
         }
@@ -2,67 +2,363 @@
 LLM Service for handling Ollama interactions and field extraction.
 """
 import requests
-import json
+from requests.adapters import HTTPAdapter
+import orjson
 import re
 import logging
-from typing import Dict, Any
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
 
 import config.settings as settings
 
 logger = logging.getLogger(__name__)
 
+# Fields the extraction prompt asks the model to return
+CERTIFICATE_FIELDS = ('nome_participante', 'evento', 'local', 'data', 'carga_horaria')
+
+# Cleanup applied to values parsed from key-value responses
+_SPECIAL_CHARS_RE = re.compile(r'[^\w\sÀ-ÿ.,;:()\-/]')
+
+# Wording, dates and hours found on the lines that state certificate fields
+_RELEVANT_LINE_RE = re.compile(
+    r'certifica|particip|conclu|ministr|carga|hora|realizad|evento|curso|workshop|palestra|local'
+    r'|\d{1,2}/\d{1,2}/\d{2,4}|\d{1,2}\s+de\s+\w+\s+de\s+\d{4}|\d+\s*h\b',
+    re.IGNORECASE
+)
+
+# Lower-cased "field:" prefixes used by the key-value fallback parser, built once
+_FIELD_PREFIXES = tuple((field, field.lower() + ':') for field in CERTIFICATE_FIELDS)
+
+# Numbers in dates and hours, compared between a text and fields cached for a similar one
+_DIGITS_RE = re.compile(r'\d+')
+
+# Characters that affect JSON object nesting
+_JSON_SYNTAX_RE = re.compile(r'[{}"\\]')
+
+# Responses of an overloaded or restarting server, worth retrying after a pause
+_TRANSIENT_STATUS_CODES = frozenset({429, 502, 503, 504})
+_RATE_LIMIT_RE = re.compile(r'rate.?limit|quota|too many requests', re.IGNORECASE)
+
+
+def _is_rate_limit(status_code: int, body: str) -> bool:
+    """
+    Check whether an error response only asks to try again later.
+    
+    Args:
+        status_code: HTTP status code
+        body: Response body
+        
+    Returns:
+        True for throttling, quota and gateway errors, False for errors a retry would repeat
+    """
+    return status_code in _TRANSIENT_STATUS_CODES or (status_code != 200 and bool(_RATE_LIMIT_RE.search(body)))
+
+
+class _JsonObjectTracker:
+    """Follows brace depth of streamed text to detect where the first JSON object ends."""
+    
+    def __init__(self):
+        """Initialize tracker before any text is seen."""
+        self.depth = 0
+        self.in_string = False
+        self.start = None
+        self.end = None
+        self._offset = 0
+        # Position of the character escaped by the last backslash inside a string
+        self._escaped_index = -1
+    
+    def feed(self, piece: str) -> bool:
+        """
+        Consume the next piece of generated text.
+        
+        Args:
+            piece: Text generated since the previous call
+            
+        Returns:
+            True once the outermost JSON object has been closed
+        """
+        # Only braces, quotes and backslashes change the state; the regex skips
+        # everything else in C instead of visiting each character in Python
+        for match in _JSON_SYNTAX_RE.finditer(piece):
+            index = self._offset + match.start()
+            char = match.group()
+            if index == self._escaped_index:
+                continue
+            
+            if self.in_string:
+                if char == '\\':
+                    self._escaped_index = index + 1
+                elif char == '"':
+                    self.in_string = False
+            elif char == '{':
+                if self.start is None:
+                    self.start = index
+                self.depth += 1
+            elif self.start is None:
+                continue
+            elif char == '"':
+                self.in_string = True
+            elif char == '}':
+                self.depth -= 1
+                if self.depth == 0:
+                    self.end = index + 1
+                    return True
+        
+        self._offset += len(piece)
+        return False
+
+
+def _find_json_object(text: str) -> Optional[str]:
+    """Return the first complete JSON object in text, found in a single pass."""
+    tracker = _JsonObjectTracker()
+    if tracker.feed(text):
+        return text[tracker.start:tracker.end]
+    return None
+
+
+def _load_json_object(text: str) -> Optional[Dict[str, Any]]:
+    """
+    Parse the JSON object in an LLM response.
+    
+    Responses generated with format "json" are parsed as-is; the object is
+    only searched for when the model wrapped it in other text.
+    
+    Args:
+        text: LLM response
+        
+    Returns:
+        Parsed object, or None if the response holds no JSON object
+        
+    Raises:
+        ValueError: If the object found is not valid JSON
+    """
+    try:
+        data = orjson.loads(text)
+        if isinstance(data, dict):
+            return data
+    except ValueError:
+        pass
+    
+    json_str = _find_json_object(text)
+    return orjson.loads(json_str) if json_str else None
+
+
+def _validate_certificate_fields(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Coerce a parsed LLM response to the certificate fields schema.
+    
+    Every field is present and holds a non-empty string or None; numbers
+    (e.g. hours given as 40) become strings, anything else and unknown
+    keys are dropped.
+    
+    Args:
+        data: Parsed JSON object
+        
+    Returns:
+        Dictionary with exactly the certificate fields
+    """
+    fields = {}
+    for field in CERTIFICATE_FIELDS:
+        value = data.get(field)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            value = str(value)
+        fields[field] = (value.strip() or None) if isinstance(value, str) else None
+    return fields
+
+
+def _find_schema_error(llm_response: str) -> Optional[str]:
+    """
+    Describe how an extraction response breaks the expected schema.
+    
+    Args:
+        llm_response: Raw LLM response
+        
+    Returns:
+        Error description, or None if the response is a JSON object with every field
+    """
+    try:
+        data = _load_json_object(llm_response)
+    except ValueError as e:
+        return f"invalid JSON ({e})"
+    
+    if data is None:
+        return "no JSON object found"
+    
+    missing_fields = [field for field in CERTIFICATE_FIELDS if field not in data]
+    if missing_fields:
+        return f"missing keys {', '.join(missing_fields)}"
+    return None
+
+
+def _read_generate_chunk(line: bytes) -> Tuple[str, bool]:
+    """Parse one NDJSON line of an Ollama generate stream into (text, done)."""
+    chunk = orjson.loads(line)
+    return chunk.get('response', ''), bool(chunk.get('done'))
+
+
+def _read_chat_completion_chunk(line: bytes) -> Tuple[str, bool]:
+    """Parse one server-sent event line of an OpenAI-compatible chat completion stream into (text, done)."""
+    if not line.startswith(b'data:'):
+        return '', False
+    data = line[5:].strip()
+    if data == b'[DONE]':
+        return '', True
+    
+    choices = orjson.loads(data).get('choices') or [{}]
+    return (choices[0].get('delta') or {}).get('content') or '', choices[0].get('finish_reason') is not None
+
+
+def _has_certificate_fields(fields: Any) -> bool:
+    """Check that a (cached) extraction result has every certificate field."""
+    return isinstance(fields, dict) and all(field in fields for field in CERTIFICATE_FIELDS)
+
+
+def _numbers(text: str) -> set:
+    """Get the numbers in a text, without leading zeros."""
+    return {number.lstrip('0') or '0' for number in _DIGITS_RE.findall(text)}
+
 
 class LLMService:
-    """Service for handling LLM operations with Ollama."""
+    """Service for handling LLM operations with Ollama or an OpenAI-compatible server."""
     
-    def __init__(self, prompt_service):
-        """Initialize LLM service with prompt service dependency."""
-        self.base_url = settings.OLLAMA_BASE_URL
+    def __init__(self, prompt_service, cache_service):
+        """Initialize LLM service with prompt and cache service dependencies."""
+        self.backend = settings.LLM_BACKEND
+        self.base_url = settings.LLM_BACKEND_URL
         self.model = settings.OLLAMA_MODEL
         self.timeout = settings.OLLAMA_TIMEOUT
         self.connection_timeout = settings.OLLAMA_CONNECTION_TIMEOUT
         self.model_download_timeout = settings.MODEL_DOWNLOAD_TIMEOUT
+        # (connect, read): an unreachable Ollama fails fast, a slow generation does not
+        self.generate_timeout = (self.connection_timeout, self.timeout)
+        self.max_generation_time = settings.OLLAMA_MAX_GENERATION_TIME
+        self.max_input_words = settings.LLM_MAX_INPUT_WORDS
+        self.relevant_lines = settings.LLM_RELEVANT_LINES
+        self.prefilter_min_chars = settings.LLM_PREFILTER_MIN_CHARS
+        self.num_predict = settings.OLLAMA_NUM_PREDICT
+        # One context size for every request: Ollama reloads the model whenever
+        # num_ctx changes, so batches get no larger window than single requests
+        self.num_ctx = settings.OLLAMA_NUM_CTX * max(1, settings.LLM_BATCH_SIZE)
+        self.num_thread = settings.OLLAMA_NUM_THREAD
+        self.keep_alive = settings.OLLAMA_KEEP_ALIVE
+        self.schema_retries = settings.LLM_SCHEMA_RETRIES
+        self.retry_backoff = settings.LLM_RETRY_BACKOFF
+        self.transient_retries = settings.LLM_TRANSIENT_RETRIES
+        self.transient_backoff = settings.LLM_TRANSIENT_BACKOFF
+        self.transient_max_backoff = settings.LLM_TRANSIENT_MAX_BACKOFF
+        self.embedding_model = settings.OLLAMA_EMBEDDING_MODEL
         self.prompt_service = prompt_service
+        self.cache_service = cache_service
+        
+        # (checked_at, installed model names) of the last /api/tags probe
+        self.status_ttl = settings.OLLAMA_STATUS_TTL
+        self._status = (None, None)
+        self._status_lock = threading.Lock()
+        
+        # Sends the documents of a batch as concurrent requests, which Ollama
+        # decodes together when started with OLLAMA_NUM_PARALLEL > 1
+        self.parallel_requests = settings.LLM_PARALLEL_REQUESTS
+        self._request_executor = ThreadPoolExecutor(
+            max_workers=max(1, self.parallel_requests), thread_name_prefix='ollama-request'
+        )
+        
+        # Keep-alive connections to Ollama shared by every call of this service;
+        # one per parallel request plus the categorization and health calls
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=max(settings.OLLAMA_POOL_MAXSIZE, self.parallel_requests + 2)
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        if settings.LLM_API_KEY:
+            self.session.headers['Authorization'] = f"Bearer {settings.LLM_API_KEY}"
     
-    def test_connection(self) -> bool:
-        """Test if Ollama is available."""
+    def close(self) -> None:
+        """Close pooled connections to Ollama."""
+        self._request_executor.shutdown(wait=False)
+        self.session.close()
+    
+    def get_available_models(self, refresh: bool = False) -> Optional[List[str]]:
+        """
+        Get the models installed in Ollama, probing /api/tags at most once per OLLAMA_STATUS_TTL.
+        
+        Args:
+            refresh: Probe Ollama even if a recent result is cached
+            
+        Returns:
+            Installed model names, or None if Ollama is unreachable
+        """
+        with self._status_lock:
+            checked_at, model_names = self._status
+            if not refresh and checked_at is not None and time.monotonic() - checked_at < self.status_ttl:
+                return model_names
+        
+        model_names = None
         try:
-            response = requests.get(
-                f"{self.base_url}/api/tags", 
-                timeout=self.connection_timeout
-            )
-            return response.status_code == 200
+            if self.backend == 'openai':
+                response = self.session.get(f"{self.base_url}/v1/models", timeout=self.connection_timeout)
+                if response.status_code == 200:
+                    models = orjson.loads(response.content).get('data', [])
+                    model_names = [model.get('id', '') for model in models]
+            else:
+                response = self.session.get(
+                    f"{self.base_url}/api/tags", 
+                    timeout=self.connection_timeout
+                )
+                if response.status_code == 200:
+                    models = orjson.loads(response.content).get('models', [])
+                    model_names = [model.get('name', '') for model in models]
         except Exception as e:
             logger.error(f"Ollama connection failed: {e}")
-            return False
+        
+        with self._status_lock:
+            self._status = (time.monotonic(), model_names)
+        return model_names
+    
+    def invalidate_status(self) -> None:
+        """Forget the cached Ollama status so the next check probes it again."""
+        with self._status_lock:
+            self._status = (None, None)
+    
+    def test_connection(self) -> bool:
+        """Test if Ollama is available."""
+        return self.get_available_models() is not None
+    
+    def is_model_available(self) -> bool:
+        """Check if the configured model is installed in Ollama."""
+        return self.model in (self.get_available_models() or ())
     
     def ensure_model_available(self) -> bool:
         """Ensure the required model is available, download if not."""
         try:
             # Check if model is already available
-            response = requests.get(
-                f"{self.base_url}/api/tags", 
-                timeout=self.connection_timeout
-            )
+            model_names = self.get_available_models(refresh=True)
             
-            if response.status_code == 200:
-                models = response.json().get('models', [])
-                model_names = [model.get('name', '') for model in models]
-                
+            if model_names is not None:
                 if self.model in model_names:
                     logger.info(f"Model {self.model} is already available")
                     return True
                 
+                if self.backend == 'openai':
+                    # OpenAI-compatible servers load their model at startup, it cannot be pulled
+                    logger.error(f"Model {self.model} is not served by {self.base_url}")
+                    return False
+                
                 # Model not found, try to pull it
                 logger.info(f"Model {self.model} not found, attempting to pull...")
-                pull_response = requests.post(
+                pull_response = self.session.post(
                     f"{self.base_url}/api/pull",
                     json={"name": self.model},
-                    timeout=self.model_download_timeout
+                    timeout=(self.connection_timeout, self.model_download_timeout)
                 )
                 
                 if pull_response.status_code == 200:
                     logger.info(f"Successfully pulled model {self.model}")
+                    self.invalidate_status()
                     return True
                 else:
                     logger.error(f"Failed to pull model {self.model}: {pull_response.status_code}")
@@ -74,20 +370,11 @@ class LLMService:
     
     def _parse_json_response(self, llm_response: str) -> Dict[str, Any]:
         """Parse JSON response from LLM."""
-        if '{' in llm_response and '}' in llm_response:
-            start = llm_response.find('{')
-            end = llm_response.rfind('}') + 1
-            json_str = llm_response[start:end]
-            
-            logger.info(f"Extracted JSON string: {json_str}")
+        extracted_data = _load_json_object(llm_response)
+        if extracted_data is not None:
+            logger.info(f"Extracted JSON object: {extracted_data}")
             
-            extracted_data = json.loads(json_str)
-            
-            # Validate required fields exist
-            required_fields = ['nome_participante', 'evento', 'local', 'data', 'carga_horaria']
-            for field in required_fields:
-                if field not in extracted_data:
-                    extracted_data[field] = None
+            extracted_data = _validate_certificate_fields(extracted_data)
             
             logger.info("Successfully extracted fields using LLM (JSON format)")
             return extracted_data
@@ -98,7 +385,6 @@ class LLMService:
         """Parse key-value format response from LLM."""
         logger.info("No JSON found, attempting to parse key-value format")
         extracted_data = {}
-        required_fields = ['nome_participante', 'evento', 'local', 'data', 'carga_horaria']
         
         # Split response into lines and parse each field
         lines = llm_response.split('\n')
@@ -112,8 +398,9 @@ class LLMService:
                 
             # Check if line starts with a field name
             field_found = False
-            for field in required_fields:
-                if line.lower().startswith(field.lower() + ':'):
+            lowered_line = line.lower()
+            for field, prefix in _FIELD_PREFIXES:
+                if lowered_line.startswith(prefix):
                     # Save previous field if exists
                     if current_field and current_value:
                         extracted_data[current_field] = current_value.strip()
@@ -133,7 +420,7 @@ class LLMService:
             extracted_data[current_field] = current_value.strip()
         
         # Ensure all required fields exist and clean values
-        for field in required_fields:
+        for field in CERTIFICATE_FIELDS:
             if field not in extracted_data:
                 extracted_data[field] = None
             else:
@@ -141,57 +428,370 @@ class LLMService:
                 value = extracted_data[field]
                 if value:
                     # Remove any trailing artifacts
-                    value = re.sub(r'\s+', ' ', value)  # Normalize whitespace
-                    value = re.sub(r'[^\w\sÀ-ÿ.,;:()\-/]', '', value)  # Remove special chars
-                    extracted_data[field] = value.strip()
+                    # Remove special chars, then collapse and trim whitespace in one split/join
+                    extracted_data[field] = ' '.join(_SPECIAL_CHARS_RE.sub('', value).split())
         
         logger.info("Successfully extracted fields using LLM (key-value format)")
         return extracted_data
     
+    def _stream_generate(self, payload: Dict[str, Any]) -> Tuple[int, str]:
+        """
+        Call Ollama's generate endpoint in streaming mode.
+        
+        Generation is abandoned as soon as the first JSON object in the output
+        is complete, so tokens the model would add after it (explanations,
+        trailing whitespace) are never produced. Closing the connection makes
+        Ollama stop generating. A generation still streaming after
+        OLLAMA_MAX_GENERATION_TIME is abandoned with the text received so far.
+        
+        With LLM_BACKEND=openai the payload is translated to a streamed
+        /v1/chat/completions request instead.
+        
+        Rate limits, gateway errors and refused connections are retried up to
+        LLM_TRANSIENT_RETRIES times with exponential backoff and jitter. Read
+        timeouts are not, as the server is busy generating and a retry would
+        only add to its queue.
+        
+        Args:
+            payload: Generate request payload
+            
+        Returns:
+            Tuple of (HTTP status code, generated text or error body)
+        """
+        if self.backend == 'openai':
+            url, body, read_chunk = (
+                f"{self.base_url}/v1/chat/completions", self._to_chat_completion(payload), _read_chat_completion_chunk
+            )
+        else:
+            url, body, read_chunk = f"{self.base_url}/api/generate", {**payload, "stream": True}, _read_generate_chunk
+        
+        for attempt in range(1, self.transient_retries + 2):
+            try:
+                status_code, text = self._post_streamed(url, body, read_chunk)
+            except requests.exceptions.ConnectionError as e:
+                if attempt > self.transient_retries:
+                    raise
+                logger.warning(f"LLM server unreachable (attempt {attempt}): {e}")
+            else:
+                if attempt > self.transient_retries or not _is_rate_limit(status_code, text):
+                    return status_code, text
+                logger.warning(f"LLM server busy (attempt {attempt}): {status_code}")
+            
+            time.sleep(self._transient_delay(attempt))
+    
+    def max_request_time(self) -> float:
+        """
+        Get the longest a single generation request can take.
+        
+        Returns:
+            Seconds to connect, wait for the first token and stream for
+            OLLAMA_MAX_GENERATION_TIME, plus every transient retry and its backoff
+        """
+        attempt_time = self.connection_timeout + self.timeout + self.max_generation_time
+        return attempt_time + self.transient_retries * (self.connection_timeout + self.transient_max_backoff)
+    
+    def max_extraction_time(self) -> float:
+        """
+        Get the longest extract_fields can take.
+        
+        Returns:
+            Seconds for the embedding lookup and every schema retry of the extraction
+        """
+        attempts = self.schema_retries + 1
+        return 2 * self.connection_timeout + attempts * (self.max_request_time() + self.retry_backoff * attempts)
+    
+    def _transient_delay(self, attempt: int) -> float:
+        """
+        Get the wait before retrying a transient failure, with full jitter.
+        
+        Args:
+            attempt: Number of the attempt that failed, starting at 1
+            
+        Returns:
+            Seconds to wait, random up to the exponential backoff for the attempt
+        """
+        backoff = min(self.transient_max_backoff, self.transient_backoff * 2 ** (attempt - 1))
+        # Random waits keep consumers throttled together from retrying together
+        return random.uniform(0, backoff)
+    
+    def _post_streamed(self, url: str, body: Dict[str, Any], read_chunk) -> Tuple[int, str]:
+        """
+        Send one streamed generation request.
+        
+        Args:
+            url: Generation endpoint
+            body: Request body
+            read_chunk: Parser of one streamed line into (text piece, done)
+            
+        Returns:
+            Tuple of (HTTP status code, generated text or error body)
+        """
+        with self.session.post(
+            url,
+            json=body,
+            timeout=self.generate_timeout,
+            stream=True
+        ) as response:
+            if response.status_code != 200:
+                if response.status_code >= 500:
+                    # Ollama may have gone down or lost the model; recheck on the next probe
+                    self.invalidate_status()
+                return response.status_code, response.text
+            
+            tracker = _JsonObjectTracker()
+            pieces = []
+            deadline = time.monotonic() + self.max_generation_time
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                
+                piece, done = read_chunk(line)
+                pieces.append(piece)
+                
+                if tracker.feed(piece):
+                    logger.debug("JSON object complete, stopping generation early")
+                    break
+                if done:
+                    break
+                if time.monotonic() > deadline:
+                    logger.warning(f"Generation still running after {self.max_generation_time}s, abandoning it")
+                    break
+            
+            return response.status_code, ''.join(pieces)
+    
+    @staticmethod
+    def _to_chat_completion(payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Translate an Ollama generate payload to an OpenAI-compatible chat completion request.
+        
+        Args:
+            payload: Generate request payload
+            
+        Returns:
+            Streamed chat completion request body
+        """
+        options = payload.get('options', {})
+        messages = [{"role": "user", "content": payload['prompt']}]
+        if payload.get('system'):
+            messages.insert(0, {"role": "system", "content": payload['system']})
+        
+        body = {
+            "model": payload['model'],
+            "messages": messages,
+            "stream": True,
+            "temperature": options.get('temperature'),
+            "top_p": options.get('top_p'),
+            "max_tokens": options.get('num_predict')
+        }
+        if payload.get('format') == 'json':
+            body["response_format"] = {"type": "json_object"}
+        return body
+    
+    def _select_relevant_lines(self, text: str) -> str:
+        """
+        Keep the OCR lines most likely to state the certificate fields.
+        
+        Lines are scored by certificate wording, dates and hours; a line also
+        scores through its neighbours, so a name printed alone between
+        "Certificamos que" and "participou" is kept.
+        
+        Args:
+            text: OCR extracted text with line breaks
+            
+        Returns:
+            Up to LLM_RELEVANT_LINES lines in their original order, or the text
+            unchanged when it is shorter than LLM_PREFILTER_MIN_CHARS
+        """
+        if self.relevant_lines <= 0 or len(text) < self.prefilter_min_chars:
+            return text
+        
+        lines = [line for line in text.splitlines() if line.strip()]
+        if len(lines) <= self.relevant_lines:
+            return text
+        
+        hits = [len(_RELEVANT_LINE_RE.findall(line)) for line in lines]
+        padded_hits = [0] + hits + [0]
+        scores = [2 * hits[index] + padded_hits[index] + padded_hits[index + 2] for index in range(len(lines))]
+        
+        # Highest scores first, earlier lines first among equal scores
+        kept = sorted(sorted(range(len(lines)), key=lambda index: -scores[index])[:self.relevant_lines])
+        logger.info(f"Kept {len(kept)} of {len(lines)} OCR lines for the prompt")
+        return '\n'.join(lines[index] for index in kept)
+    
+    def _prepare_prompt_text(self, text: str) -> str:
+        """Reduce OCR text to the part worth sending to the model."""
+        text = self.prompt_service.preclean_ocr(text)
+        return self._truncate_for_prompt(self._select_relevant_lines(text))
+    
+    def _truncate_for_prompt(self, text: str) -> str:
+        """
+        Keep only the leading words of OCR text for the extraction prompt.
+        
+        Certificate fields are stated at the top of the document; later text
+        (program content, signatures, verso pages) only adds prompt tokens.
+        
+        Args:
+            text: OCR extracted text
+            
+        Returns:
+            Text cut after LLM_MAX_INPUT_WORDS words, with original spacing kept
+        """
+        if self.max_input_words <= 0:
+            return text
+        
+        # One split in C; the last item is the untouched rest of the text after the kept words
+        parts = text.split(None, self.max_input_words)
+        if len(parts) <= self.max_input_words:
+            return text
+        return text[:len(text) - len(parts[-1])].rstrip()
+    
+    def _embed_text(self, text: str) -> Optional[List[float]]:
+        """
+        Embed text with the configured Ollama embedding model.
+        
+        Args:
+            text: Text to embed
+            
+        Returns:
+            Embedding vector, or None if Ollama could not provide one
+        """
+        try:
+            if self.backend == 'openai':
+                response = self.session.post(
+                    f"{self.base_url}/v1/embeddings",
+                    json={"model": self.embedding_model, "input": text},
+                    timeout=(self.connection_timeout, self.connection_timeout)
+                )
+                if response.status_code == 200:
+                    data = orjson.loads(response.content).get('data') or [{}]
+                    return data[0].get('embedding') or None
+            else:
+                response = self.session.post(
+                    f"{self.base_url}/api/embeddings",
+                    json={"model": self.embedding_model, "prompt": text},
+                    timeout=(self.connection_timeout, self.connection_timeout)
+                )
+                if response.status_code == 200:
+                    return orjson.loads(response.content).get('embedding') or None
+            logger.warning(f"Ollama embeddings error: {response.status_code}")
+        except Exception as e:
+            logger.warning(f"Error embedding text for cache lookup: {e}")
+        return None
+    
+    def _fields_found_in_text(self, fields: Dict[str, Any], fingerprint: str) -> bool:
+        """
+        Check that fields cached for a similar text also hold for this one.
+        
+        Certificates of the same template differ only in participant, hours
+        and date, and still embed almost identically, so a similar entry is
+        used only if its participant name and the numbers of its hours and
+        date all appear in the text.
+        
+        Args:
+            fields: Extraction result cached for a similar text
+            fingerprint: Fingerprint of the text being extracted
+            
+        Returns:
+            True if the fields can be reused for the text
+        """
+        name = self.cache_service.fingerprint_text(fields.get('nome_participante') or '')
+        if name and f" {name} " not in f" {fingerprint} ":
+            return False
+        
+        cached_numbers = _numbers(f"{fields.get('carga_horaria') or ''} {fields.get('data') or ''}")
+        if not cached_numbers <= _numbers(fingerprint):
+            return False
+        return True
+    
     def extract_fields(self, text: str) -> Dict[str, Any]:
         """Extract certificate fields using Ollama LLM."""
+        text = self._prepare_prompt_text(text)
+        
+        # Scans of the same certificate (re-submissions, OCR noise) yield the same extraction
+        cache_scope = f"{self.model}|{self.prompt_service.get_prompt_version('certificate_extraction')}"
+        fingerprint = self.cache_service.fingerprint_text(text)
+        cache_key = self.cache_service.make_key(cache_scope, fingerprint)
+        cached_fields = self.cache_service.get(cache_key)
+        if _has_certificate_fields(cached_fields):
+            logger.info("Using cached LLM extraction result")
+            return dict(cached_fields)
+        
+        # Near-duplicates (a few characters of OCR noise apart) are matched by embedding
+        embedding = self._embed_text(fingerprint) if self.embedding_model else None
+        if embedding:
+            similar_fields = self.cache_service.get_similar(cache_scope, embedding)
+            if _has_certificate_fields(similar_fields) and self._fields_found_in_text(similar_fields, fingerprint):
+                logger.info("Using LLM extraction result cached for a similar text")
+                self.cache_service.set(cache_key, dict(similar_fields))
+                return dict(similar_fields)
+        
         try:
             # Get formatted prompt from prompt service
             prompt = self.prompt_service.get_certificate_extraction_prompt(text)
             
             payload = {
                 "model": self.model,
+                "system": self.prompt_service.get_system_prompt('certificate_extraction'),
                 "prompt": prompt,
-                "stream": False,
+                "format": "json",  # Constrain decoding to a JSON object
+                "keep_alive": self.keep_alive,
                 "options": {
-                    "temperature": 0.1,  # Low temperature for consistent extraction
-                    "top_p": 0.9
+                    "temperature": 0,  # Greedy decoding: same text, same fields, safe to cache
+                    "top_p": 0.9,
+                    "num_predict": self.num_predict,
+                    "num_ctx": self.num_ctx,
+                    "num_thread": self.num_thread
                 }
             }
             
-            logger.info(f"Sending request to Ollama with model: {self.model}")
-            
-            response = requests.post(
-                f"{self.base_url}/api/generate",
-                json=payload,
-                timeout=self.timeout
-            )
-            
-            logger.info(f"Ollama response status: {response.status_code}")
+            for attempt in range(1, self.schema_retries + 2):
+                logger.info(f"Sending request to Ollama with model: {self.model} (attempt {attempt})")
+                
+                status_code, llm_response = self._stream_generate(payload)
+                
+                logger.info(f"Ollama response status: {status_code}")
+                
+                if status_code != 200:
+                    break
+                
+                # A reply breaking the schema is retried with the error fed back to the model
+                schema_error = _find_schema_error(llm_response)
+                if schema_error is None or attempt > self.schema_retries:
+                    break
+                
+                logger.warning(f"Extraction attempt {attempt} violated the schema: {schema_error}")
+                time.sleep(self.retry_backoff * attempt)
+                payload["prompt"] = (
+                    f"{prompt}\n\nYour previous reply failed: {schema_error}. "
+                    f"Reply only with a JSON object with exactly these keys: {', '.join(CERTIFICATE_FIELDS)}."
+                )
             
-            if response.status_code == 200:
-                result = response.json()
-                llm_response = result.get('response', '').strip()
+            if status_code == 200:
+                llm_response = llm_response.strip()
                 
                 logger.info(f"LLM raw response: {llm_response[:200]}...")
                 
                 # Try to parse JSON response first, then fallback to key-value
+                extracted_data = None
                 try:
-                    return self._parse_json_response(llm_response)
-                except (json.JSONDecodeError, ValueError):
+                    extracted_data = self._parse_json_response(llm_response)
+                except ValueError:
                     try:
-                        return self._parse_key_value_response(llm_response)
+                        extracted_data = self._parse_key_value_response(llm_response)
                     except Exception as e:
                         logger.error(f"Failed to parse LLM response: {e}")
                         logger.error(f"LLM response was: {llm_response}")
+                
+                if extracted_data is not None:
+                    # Results without any field are not worth replaying for the same text
+                    if any(extracted_data.get(field) for field in CERTIFICATE_FIELDS):
+                        self.cache_service.set(cache_key, dict(extracted_data))
+                        if embedding:
+                            self.cache_service.set_similar(cache_scope, embedding, dict(extracted_data))
+                    return extracted_data
             else:
-                logger.error(f"Ollama API error: {response.status_code}")
-                logger.error(f"Response content: {response.text}")
+                logger.error(f"Ollama API error: {status_code}")
+                logger.error(f"Response content: {llm_response}")
             
             return self._get_empty_fields()
                 
@@ -199,6 +799,171 @@ class LLMService:
             logger.error(f"Error calling Ollama: {e}")
             return self._get_empty_fields()
     
+    def _extract_fields_in_one_call(self, texts: List[str]) -> Optional[List[Dict[str, Any]]]:
+        """
+        Extract fields of several certificates with a single generation.
+        
+        Args:
+            texts: Truncated OCR texts
+            
+        Returns:
+            Extracted fields per text in input order, or None if the response
+            does not hold one object per text
+        """
+        payload = {
+            "model": self.model,
+            "system": self.prompt_service.get_system_prompt('certificate_batch_extraction'),
+            "prompt": self.prompt_service.get_certificate_batch_extraction_prompt(texts),
+            "format": "json",
+            "keep_alive": self.keep_alive,
+            "options": {
+                "temperature": 0,
+                "top_p": 0.9,
+                # Room for every document's fields; the context is sized for LLM_BATCH_SIZE
+                "num_predict": self.num_predict * len(texts),
+                "num_ctx": self.num_ctx,
+                "num_thread": self.num_thread
+            }
+        }
+        
+        logger.info(f"Sending batch extraction of {len(texts)} certificates to Ollama")
+        status_code, llm_response = self._stream_generate(payload)
+        if status_code != 200:
+            logger.error(f"Ollama API error for batch extraction: {status_code}")
+            return None
+        
+        try:
+            documents = (_load_json_object(llm_response) or {}).get('documents')
+        except ValueError:
+            documents = None
+        
+        if not isinstance(documents, list) or len(documents) != len(texts) \
+                or not all(isinstance(document, dict) for document in documents):
+            logger.warning("Batch extraction response does not match the documents sent")
+            return None
+        
+        return [_validate_certificate_fields(document) for document in documents]
+    
+    def extract_fields_batch(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """
+        Extract certificate fields of several OCR texts, sharing Ollama's work.
+        
+        Cached texts are answered from the cache. With LLM_PARALLEL_REQUESTS > 1
+        the rest are sent as concurrent requests that Ollama batches itself,
+        otherwise they are sent together in one prompt. Texts the combined
+        response leaves without fields are extracted on their own.
+        
+        Args:
+            texts: OCR extracted texts
+            
+        Returns:
+            Extracted fields per text, in input order
+        """
+        truncated_texts = [self._prepare_prompt_text(text) for text in texts]
+        cache_scope = f"{self.model}|{self.prompt_service.get_prompt_version('certificate_extraction')}"
+        cache_keys = [
+            self.cache_service.make_key(cache_scope, self.cache_service.fingerprint_text(text))
+            for text in truncated_texts
+        ]
+        
+        results = []
+        for cache_key in cache_keys:
+            cached_fields = self.cache_service.get(cache_key)
+            results.append(dict(cached_fields) if _has_certificate_fields(cached_fields) else None)
+        
+        pending = [index for index, result in enumerate(results) if result is None]
+        if len(pending) > 1 and self.parallel_requests <= 1:
+            try:
+                batch_results = self._extract_fields_in_one_call([truncated_texts[index] for index in pending])
+            except Exception as e:
+                logger.error(f"Error calling Ollama for batch extraction: {e}")
+                batch_results = None
+            
+            for index, fields in zip(pending, batch_results or []):
+                if any(fields.values()):
+                    results[index] = fields
+                    self.cache_service.set(cache_keys[index], dict(fields))
+        
+        missing = [index for index, result in enumerate(results) if result is None]
+        extracted = self._request_executor.map(self.extract_fields, [texts[index] for index in missing])
+        for index, fields in zip(missing, extracted):
+            results[index] = fields
+        
+        return results
+    
+    def extract_fields_and_categorize(
+        self,
+        text: str,
+        categories_text: str
+    ) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+        """
+        Extract certificate fields and choose the activity category in one request.
+        
+        Saves the second prefill of the OCR text that a separate categorization
+        request costs. A reply without usable fields falls back to extract_fields.
+        
+        Args:
+            text: OCR extracted text
+            categories_text: Formatted string with available categories
+            
+        Returns:
+            Tuple of (extracted fields, categorization with category_id and
+            reasoning, or None if the reply did not choose a category)
+        """
+        prompt_text = self._prepare_prompt_text(text)
+        cache_key = self.cache_service.make_key(
+            self.model,
+            self.prompt_service.get_prompt_version('certificate_combined'),
+            self.cache_service.fingerprint_text(prompt_text),
+            categories_text
+        )
+        cached_result = self.cache_service.get(cache_key)
+        if cached_result:
+            logger.info("Using cached combined extraction and categorization result")
+            return dict(cached_result['fields']), dict(cached_result['categorization'])
+        
+        payload = {
+            "model": self.model,
+            "system": self.prompt_service.get_certificate_combined_system_prompt(categories_text),
+            "prompt": self.prompt_service.get_prompt('certificate_combined', text=prompt_text),
+            "format": "json",
+            "keep_alive": self.keep_alive,
+            "options": {
+                "temperature": 0,
+                "top_p": 0.9,
+                # Room for the fields plus the category and its reasoning
+                "num_predict": self.num_predict * 2,
+                "num_ctx": self.num_ctx,
+                "num_thread": self.num_thread
+            }
+        }
+        
+        try:
+            logger.info(f"Sending combined extraction and categorization request to Ollama with model: {self.model}")
+            status_code, llm_response = self._stream_generate(payload)
+            reply = _load_json_object(llm_response) if status_code == 200 else None
+        except Exception as e:
+            logger.error(f"Error calling Ollama for combined extraction: {e}")
+            reply = None
+        
+        extracted = reply.get('extracted') if reply else None
+        if not _has_certificate_fields(extracted):
+            logger.warning("Combined reply has no usable fields, extracting them on their own")
+            return self.extract_fields(text), None
+        
+        fields = _validate_certificate_fields(extracted)
+        categorization = {
+            'category_id': reply.get('category_id'),
+            'calculated_hours': None,
+            'confidence': None,
+            'reasoning': reply.get('reasoning')
+        }
+        if categorization['category_id'] is None:
+            return fields, None
+        
+        self.cache_service.set(cache_key, {'fields': dict(fields), 'categorization': dict(categorization)})
+        return fields, categorization
+    
     def categorize_activity(
         self, 
         raw_text: str,
@@ -221,49 +986,64 @@ class LLMService:
                 'reasoning': str
             }
         """
+        # The category list is part of the key, so editing categories invalidates old results
+        cache_key = self.cache_service.make_key(
+            self.model,
+            self.prompt_service.get_prompt_version('activity_categorization'),
+            self.cache_service.fingerprint_text(raw_text or ''),
+            *(str(extracted_data.get(field) or '') for field in CERTIFICATE_FIELDS),
+            categories_text
+        )
+        cached_categorization = self.cache_service.get(cache_key)
+        if cached_categorization:
+            logger.info("Using cached LLM categorization result")
+            return dict(cached_categorization)
+        
         try:
             # Build proper categorization prompt using PromptService
             prompt = self.prompt_service.get_activity_categorization_prompt(
-                raw_text=raw_text,
+                raw_text=self.prompt_service.preclean_ocr(raw_text or ''),
                 nome_participante=extracted_data.get('nome_participante', ''),
                 evento=extracted_data.get('evento', ''),
                 local=extracted_data.get('local', ''),
                 data=extracted_data.get('data', ''),
-                carga_horaria=extracted_data.get('carga_horaria', ''),
-                categories_text=categories_text
+                carga_horaria=extracted_data.get('carga_horaria', '')
             )
             
             payload = {
                 "model": self.model,
+                "system": self.prompt_service.get_activity_categorization_system_prompt(categories_text),
                 "prompt": prompt,
-                "stream": False,
+                "format": "json",  # Constrain decoding to a JSON object
+                "keep_alive": self.keep_alive,
                 "options": {
-                    "temperature": 0.1,  # Low temperature for consistent categorization
-                    "top_p": 0.9
+                    "temperature": 0,  # Greedy decoding: same input, same category, safe to cache
+                    "top_p": 0.9,
+                    "num_predict": self.num_predict,
+                    "num_ctx": self.num_ctx,
+                    "num_thread": self.num_thread
                 }
             }
             
             logger.info(f"Sending categorization request to Ollama with model: {self.model}")
             
-            response = requests.post(
-                f"{self.base_url}/api/generate",
-                json=payload,
-                timeout=self.timeout
-            )
+            status_code, llm_response = self._stream_generate(payload)
             
-            logger.info(f"Ollama categorization response status: {response.status_code}")
+            logger.info(f"Ollama categorization response status: {status_code}")
             
-            if response.status_code == 200:
-                result = response.json()
-                llm_response = result.get('response', '').strip()
+            if status_code == 200:
+                llm_response = llm_response.strip()
                 
                 logger.info(f"LLM categorization raw response: {llm_response[:200]}...")
                 
                 # Parse the categorization response
-                return self._parse_categorization_response(llm_response)
+                categorization = self._parse_categorization_response(llm_response)
+                if categorization.get('category_id') is not None:
+                    self.cache_service.set(cache_key, dict(categorization))
+                return categorization
             else:
-                logger.error(f"Ollama API error for categorization: {response.status_code}")
-                logger.error(f"Response content: {response.text}")
+                logger.error(f"Ollama API error for categorization: {status_code}")
+                logger.error(f"Response content: {llm_response}")
                 return self._get_empty_categorization()
                 
         except Exception as e:
@@ -274,13 +1054,8 @@ class LLMService:
         """Parse categorization response from LLM."""
         # Try to parse JSON response first
         try:
-            if '{' in llm_response and '}' in llm_response:
-                start = llm_response.find('{')
-                end = llm_response.rfind('}') + 1
-                json_str = llm_response[start:end]
-                
-                categorization_data = json.loads(json_str)
-                
+            categorization_data = _load_json_object(llm_response)
+            if categorization_data is not None:
                 # Ensure required fields exist with defaults
                 return {
                     'category_id': categorization_data.get('category_id'),
@@ -288,7 +1063,7 @@ class LLMService:
                     'confidence': categorization_data.get('confidence'),
                     'reasoning': categorization_data.get('reasoning', llm_response)
                 }
-        except (json.JSONDecodeError, ValueError):
+        except ValueError:
             pass
         
         # Fallback: try to extract information from text
@@ -311,10 +1086,4 @@ class LLMService:
     
     def _get_empty_fields(self) -> Dict[str, Any]:
         """Return empty fields structure."""
-        return {
-            'nome_participante': None,
-            'evento': None,
-            'local': None,
-            'data': None,
-            'carga_horaria': None
-        }
\ No newline at end of file
+        return dict.fromkeys(CERTIFICATE_FIELDS)
\ No newline at end of file
@@ -1,55 +1,293 @@
 """
 OCR Service for text extraction from images and PDFs.
 """
+import hashlib
+import os
+import queue
+import re
+import tempfile
+from io import BytesIO
+import numpy as np
 import pytesseract
-from PIL import Image
-from pdf2image import convert_from_bytes
+from PIL import Image, ImageFilter
 import logging
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Union
 
 import config.settings as settings
 
+# Pages are OCRed in parallel, one Tesseract process per page; keep each one
+# single-threaded so they don't oversubscribe the CPU with OpenMP threads.
+os.environ.setdefault('OMP_THREAD_LIMIT', '1')
+
 logger = logging.getLogger(__name__)
 
+# Skew angles (degrees) corrected by deskewing; outside them the estimate is unreliable
+_MIN_SKEW_ANGLE = 0.3
+_MAX_SKEW_ANGLE = 10.0
 
-class OCRService:
-    def extract_text(self, submission):
-        """Download file from S3 and extract text for the given submission."""
-        # TODO: Implement S3 download and OCR extraction logic
-        # Example:
-        # file_bytes = S3Service().download_file(submission.s3_key)
-        # text = self.process_file(file_bytes, submission.original_filename.split('.')[-1])
-        # return text
-        pass
 
-    def extract_metadata(self, submission):
-        """Extract metadata from the given submission's file."""
-        # TODO: Implement metadata extraction logic
-        pass
+def _otsu_threshold(histogram: List[int]) -> int:
+    """
+    Pick the grayscale threshold that best separates ink from paper (Otsu's method).
+    
+    Args:
+        histogram: 256-bin histogram of a grayscale image
+        
+    Returns:
+        Threshold value, pixels below it are ink
+    """
+    total = sum(histogram)
+    if not total:
+        return 128
+    
+    total_sum = sum(value * count for value, count in enumerate(histogram))
+    background_count = 0
+    background_sum = 0
+    best_threshold = 0
+    best_variance = -1.0
+    
+    for value, count in enumerate(histogram):
+        background_count += count
+        if background_count == 0:
+            continue
+        foreground_count = total - background_count
+        if foreground_count == 0:
+            break
+        
+        background_sum += value * count
+        background_mean = background_sum / background_count
+        foreground_mean = (total_sum - background_sum) / foreground_count
+        variance = background_count * foreground_count * (background_mean - foreground_mean) ** 2
+        if variance > best_variance:
+            best_variance = variance
+            best_threshold = value + 1
+    
+    return best_threshold
+
+
+# Wording present on the page that states the certificate fields
+_CERTIFICATE_KEYWORDS_RE = re.compile(r'certifica|carga\s+hor|certificate', re.IGNORECASE)
+
+# Certificate wording, hour counts and dates; documents without them are not certificates
+_CERTIFICATE_EVIDENCE_RE = re.compile(
+    r'certifica|particip|conclu|carga\s+hor|\bhoras?\b|\d+\s*h\b'
+    r'|\d{1,2}/\d{1,2}/\d{2,4}|\d{1,2}\s+de\s+\w+\s+de\s+\d{4}',
+    re.IGNORECASE
+)
+
+
+class OCRService:
     """Service for handling OCR operations."""
     
     def __init__(self):
         self.tesseract_config = settings.TESSERACT_CONFIG
+        self.max_workers = max(1, settings.OCR_MAX_WORKERS)
+        self.max_image_side = settings.OCR_MAX_IMAGE_SIDE
+        self.early_stop_words = settings.OCR_EARLY_STOP_WORDS
+        self.min_certificate_evidence = settings.CERTIFICATE_MIN_EVIDENCE
+        self.binarize_threshold = settings.OCR_BINARIZE_THRESHOLD
+        self.denoise = settings.OCR_DENOISE
+        self.deskew = settings.OCR_DESKEW
+        self.fallback_min_words = settings.OCR_FALLBACK_MIN_WORDS
+        self.tesserocr = self._load_tesserocr() if settings.OCR_ENGINE == 'tesserocr' else None
+        self.use_tesserocr = self.tesserocr is not None
+        # Idle in-process Tesseract APIs, each one is used by a single thread at a time
+        self._tesserocr_apis = queue.LifoQueue()
+        # Shared by every document so page workers (and their tesserocr APIs) are reused
+        self._page_executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ocr-page")
+        
+        logger.info(f"OCR engine: {'tesserocr' if self.use_tesserocr else 'pytesseract'}")
     
-    def extract_text_from_image(self, image: Image.Image) -> tuple[str, float]:
-        """Extract text from PIL Image using Tesseract OCR with confidence score."""
+    @staticmethod
+    def _load_tesserocr():
+        """Import tesserocr (and libtesseract) only when the OCR engine is used."""
         try:
-            # Use image_to_data to get confidence information
-            data = pytesseract.image_to_data(image, config=self.tesseract_config, output_type=pytesseract.Output.DICT)
+            import tesserocr
+            return tesserocr
+        except ImportError:
+            logger.info("tesserocr is not installed, falling back to pytesseract")
+            return None
+    
+    def _acquire_tesserocr_api(self):
+        """Get an idle Tesseract API, creating one if all are in use."""
+        try:
+            return self._tesserocr_apis.get_nowait()
+        except queue.Empty:
+            logger.info("Initializing in-process Tesseract API")
+            return self.tesserocr.PyTessBaseAPI(
+                lang=settings.TESSERACT_LANG,
+                oem=settings.TESSERACT_OEM,
+                psm=settings.TESSERACT_PSM
+            )
+    
+    @staticmethod
+    def _group_lines(data: dict) -> dict:
+        """
+        Group Tesseract image_to_data rows into text lines.
+        
+        Args:
+            data: image_to_data output as a dict of columns
             
-            # Extract text and calculate confidence
-            text_parts = []
-            confidences = []
+        Returns:
+            Dict of 1-based page number to (text lines, per-word confidences)
+        """
+        pages = {}
+        current_line = None
+        rows = zip(data['page_num'], data['block_num'], data['par_num'], data['line_num'], data['text'], data['conf'])
+        for page_num, block_num, par_num, line_num, word, confidence in rows:
+            if not word.strip():
+                continue
             
-            for i, word in enumerate(data['text']):
-                if word.strip():  # Only process non-empty words
-                    text_parts.append(word)
-                    confidence = data['conf'][i]
-                    if confidence > 0:  # Valid confidence score
-                        confidences.append(confidence)
+            lines, confidences = pages.setdefault(page_num, ([], []))
+            line_key = (page_num, block_num, par_num, line_num)
+            if line_key == current_line:
+                lines[-1] += ' ' + word
+            else:
+                lines.append(word)
+                current_line = line_key
+            confidences.append(confidence)
+        
+        return pages
+    
+    def _run_tesseract(self, image: Image.Image) -> tuple[List[str], List[float]]:
+        """
+        Run Tesseract on an image.
+        
+        Uses a resident tesserocr API when available, which keeps the language
+        models loaded between calls instead of spawning a Tesseract process and
+        reloading them for every image.
+        
+        Args:
+            image: Image to recognize
             
-            text = ' '.join(text_parts)
-            avg_confidence = sum(confidences) / len(confidences) if confidences else 0.0
+        Returns:
+            Tuple of (recognized text lines, per-word confidences)
+        """
+        if self.use_tesserocr:
+            api = self._acquire_tesserocr_api()
+            try:
+                api.SetImage(image)
+                text = api.GetUTF8Text()
+                confidences = api.AllWordConfidences()
+            finally:
+                api.Clear()
+                self._tesserocr_apis.put(api)
+            return [' '.join(line.split()) for line in text.splitlines() if line.strip()], confidences
+        
+        data = pytesseract.image_to_data(image, config=self.tesseract_config, output_type=pytesseract.Output.DICT)
+        return self._group_lines(data).get(1, ([], []))
+    
+    @staticmethod
+    def _deskew_image(image: Image.Image) -> Image.Image:
+        """
+        Rotate a grayscale page so its text lines are horizontal.
+        
+        The skew is estimated from the orientation (second-order moments) of
+        the dark pixels, which follows the text lines on certificate layouts.
+        
+        Args:
+            image: Grayscale image
+            
+        Returns:
+            Rotated image, or the same image when no reliable skew is found
+        """
+        ys, xs = np.nonzero(np.asarray(image) < 128)
+        if len(xs) < 100:
+            return image
+        
+        xs = xs - xs.mean()
+        ys = ys - ys.mean()
+        angle = np.degrees(0.5 * np.arctan2(2 * np.mean(xs * ys), np.mean(xs * xs) - np.mean(ys * ys)))
+        if not _MIN_SKEW_ANGLE <= abs(angle) <= _MAX_SKEW_ANGLE:
+            return image
+        
+        logger.debug(f"Deskewing page by {angle:.2f} degrees")
+        return image.rotate(angle, resample=Image.BILINEAR, expand=True, fillcolor=255)
+    
+    def _prepare_image(self, image: Image.Image, enhance: bool = True) -> Image.Image:
+        """
+        Downscale, clean up and binarize an image before OCR.
+        
+        Tesseract time grows with pixel count and scans usually come in at a
+        higher resolution than printed certificate text needs.
+        
+        Args:
+            image: Image to prepare
+            enhance: Denoise, deskew and binarize; False only converts to grayscale
+            
+        Returns:
+            Bilevel (grayscale if not enhanced) image no larger than OCR_MAX_IMAGE_SIDE on its longest side
+        """
+        # Resize a single channel, on our own copy so the caller's image is untouched
+        image = image.convert('L')
+        if max(image.size) > self.max_image_side:
+            image.thumbnail((self.max_image_side, self.max_image_side), Image.LANCZOS)
+        
+        if not enhance:
+            return image
+        
+        if self.denoise:
+            image = image.filter(ImageFilter.MedianFilter(3))
+        if self.deskew:
+            image = self._deskew_image(image)
+        
+        threshold = self.binarize_threshold or _otsu_threshold(image.histogram())
+        return image.point([0 if value < threshold else 255 for value in range(256)], '1')
+    
+    def _with_fallback(self, image: Image.Image, result: tuple[str, float]) -> tuple[str, float]:
+        """
+        Re-OCR the plain grayscale page when the preprocessed one yielded almost no text.
+        
+        Args:
+            image: Original page image
+            result: (text, confidence) recognized on the preprocessed image
+            
+        Returns:
+            The result with more words
+        """
+        if len(result[0].split()) >= self.fallback_min_words:
+            return result
+        
+        fallback = self._summarize_lines(*self._run_tesseract(self._prepare_image(image, enhance=False)))
+        if len(fallback[0].split()) > len(result[0].split()):
+            logger.info("Preprocessed page yielded little text, using OCR of the original page")
+            return fallback
+        return result
+    
+    def _summarize_lines(self, lines: List[str], word_confidences: List[float]) -> tuple[str, float]:
+        """Join recognized lines, keeping the line breaks, and average their valid confidence scores."""
+        # Only positive scores are valid confidences
+        confidences = [confidence for confidence in word_confidences if confidence > 0]
+        
+        text = '\n'.join(lines)
+        avg_confidence = sum(confidences) / len(confidences) if confidences else 0.0
+        return text, avg_confidence
+    
+    def _draft_grayscale(self, image: Image.Image) -> None:
+        """
+        Ask the decoder for a grayscale image close to the OCR size.
+        
+        JPEG decoders can produce grayscale and scale by 1/2, 1/4 or 1/8
+        while decoding, so large color scans are never decoded in full.
+        Other formats ignore the request.
+        
+        Args:
+            image: Opened, not yet loaded image
+        """
+        width, height = image.size
+        scale = self.max_image_side / max(width, height)
+        if scale >= 1:
+            image.draft('L', image.size)
+        else:
+            image.draft('L', (max(1, int(width * scale)), max(1, int(height * scale))))
+    
+    def extract_text_from_image(self, image: Image.Image) -> tuple[str, float]:
+        """Extract text from PIL Image using Tesseract OCR with confidence score."""
+        try:
+            text, avg_confidence = self._with_fallback(
+                image, self._summarize_lines(*self._run_tesseract(self._prepare_image(image)))
+            )
             
             logger.info(f"Extracted {len(text)} characters from image with {avg_confidence:.2f}% confidence")
             return text, avg_confidence
@@ -57,30 +295,194 @@ class OCRService:
             logger.error(f"Error extracting text from image: {e}")
             raise
     
-    def convert_pdf_to_images(self, pdf_bytes: bytes) -> List[Image.Image]:
-        """Convert PDF bytes to list of PIL Images."""
+    def extract_text_from_page_batch(self, images: List[Image.Image]) -> List[tuple[str, float]]:
+        """
+        Extract text from several pages with a single Tesseract process.
+        
+        Tesseract accepts a text file listing image paths and loads its
+        language models once for the whole list, instead of once per page.
+        
+        Args:
+            images: Page images to recognize
+            
+        Returns:
+            List of (text, confidence) tuples, one per page in input order
+        """
+        with tempfile.TemporaryDirectory(prefix='ocr_pages_') as tmp_dir:
+            paths = []
+            for index, image in enumerate(images):
+                path = os.path.join(tmp_dir, f'page_{index}.png')
+                self._prepare_image(image).save(path, compress_level=1)
+                paths.append(path)
+            
+            list_path = os.path.join(tmp_dir, 'pages.txt')
+            with open(list_path, 'w') as list_file:
+                list_file.write('\n'.join(paths) + '\n')
+            
+            data = pytesseract.image_to_data(list_path, config=self.tesseract_config, output_type=pytesseract.Output.DICT)
+        
+        # Rows carry the 1-based index of the listed image they belong to
+        pages = self._group_lines(data)
+        
+        return [
+            self._with_fallback(image, self._summarize_lines(*pages.get(page_num, ([], []))))
+            for page_num, image in enumerate(images, 1)
+        ]
+    
+    def _extract_text_from_pages(self, images: List[Image.Image]) -> List[tuple[str, float]]:
+        """
+        OCR pages concurrently.
+        
+        With resident tesserocr APIs each page is its own task; otherwise
+        consecutive pages are grouped so each worker starts one Tesseract process.
+        
+        Args:
+            images: Page images to recognize
+            
+        Returns:
+            List of (text, confidence) tuples, one per page in input order
+        """
+        if not images:
+            return []
+        
+        if self.use_tesserocr:
+            return list(self._page_executor.map(self.extract_text_from_image, images))
+        
+        batch_size = -(-len(images) // min(len(images), self.max_workers))
+        batches = [images[start:start + batch_size] for start in range(0, len(images), batch_size)]
+        return [result for batch in self._page_executor.map(self.extract_text_from_page_batch, batches) for result in batch]
+    
+    def _extract_text_from_leading_pages(self, images: List[Image.Image]) -> List[tuple[str, float]]:
+        """
+        OCR pages in order, a round of parallel workers at a time, until enough text is found.
+        
+        Certificate fields are on the first page(s); once the pages read so far
+        hold OCR_EARLY_STOP_WORDS words including certificate wording, the
+        remaining pages (annexes, program content) are not OCRed.
+        
+        Args:
+            images: Page images in document order
+            
+        Returns:
+            List of (text, confidence) tuples for the pages that were OCRed
+        """
+        results = []
+        word_count = 0
+        found_keywords = False
+        
+        for start in range(0, len(images), self.max_workers):
+            round_results = self._extract_text_from_pages(images[start:start + self.max_workers])
+            results.extend(round_results)
+            
+            for text, _ in round_results:
+                word_count += len(text.split())
+                found_keywords = found_keywords or bool(_CERTIFICATE_KEYWORDS_RE.search(text))
+            
+            if found_keywords and word_count >= self.early_stop_words and len(results) < len(images):
+                logger.info(f"Skipping OCR of {len(images) - len(results)} trailing page(s)")
+                break
+        
+        return results
+    
+    def looks_like_certificate(self, text: str) -> bool:
+        """
+        Cheaply check that OCR text could be a certificate before it is sent to the LLM.
+        
+        Args:
+            text: OCR extracted text
+            
+        Returns:
+            True if the text has at least CERTIFICATE_MIN_EVIDENCE certificate
+            keywords, hour counts or dates (always True when the check is disabled)
+        """
+        if self.min_certificate_evidence <= 0:
+            return True
+        
+        evidence = 0
+        for _ in _CERTIFICATE_EVIDENCE_RE.finditer(text):
+            evidence += 1
+            if evidence >= self.min_certificate_evidence:
+                return True
+        return False
+    
+    def convert_pdf_to_images(
+        self,
+        pdf: Union[bytes, str],
+        output_folder: Optional[str] = None
+    ) -> List[Image.Image]:
+        """
+        Convert a PDF to list of PIL Images.
+        
+        Pages are split across PDF_RENDER_THREADS pdftoppm processes. With an
+        output folder, pages are written there and loaded lazily instead of
+        being piped through memory all at once.
+        
+        Args:
+            pdf: PDF file content, or path of a PDF file, which pdftoppm reads
+                without the copy to a temporary file made for content
+            output_folder: Directory for rendered pages, must outlive the returned images
+            
+        Returns:
+            List of page images
+        """
+        # Imported here so image-only processes never load the poppler bindings
+        from pdf2image import convert_from_bytes, convert_from_path
+        
+        convert = convert_from_path if isinstance(pdf, str) else convert_from_bytes
         try:
-            images = convert_from_bytes(pdf_bytes)
+            images = convert(
+                pdf,
+                dpi=settings.PDF_DPI,
+                grayscale=True,  # OCR only needs luminance, a third of the RGB bytes
+                thread_count=max(1, settings.PDF_RENDER_THREADS),
+                output_folder=output_folder
+            )
             logger.info(f"Converted PDF to {len(images)} images")
             return images
         except Exception as e:
             logger.error(f"Error converting PDF to images: {e}")
             raise
     
-    def extract_text_from_pdf(self, pdf_bytes: bytes) -> tuple[str, float]:
-        """Extract text from PDF by converting to images first."""
+    @staticmethod
+    def _page_key(image: Image.Image) -> tuple:
+        """Identify a rendered page by its size, mode and pixel digest."""
+        return image.size, image.mode, hashlib.blake2b(image.tobytes(), digest_size=16).digest()
+    
+    def extract_text_from_pdf(self, pdf: Union[bytes, str]) -> tuple[str, float]:
+        """Extract text from PDF content or a PDF file path by converting to images first."""
         try:
-            images = self.convert_pdf_to_images(pdf_bytes)
+            with tempfile.TemporaryDirectory(prefix='pdf_pages_') as pages_dir:
+                images = self.convert_pdf_to_images(pdf, output_folder=pages_dir)
+                
+                # Identical pages (duplicated sheets, repeated scans) are OCRed only once
+                page_keys = [self._page_key(image) for image in images]
+                unique_pages = dict(zip(page_keys, images))
+                if len(unique_pages) < len(images):
+                    logger.info(f"Skipping OCR of {len(images) - len(unique_pages)} duplicate page(s)")
+                
+                # Tesseract runs outside the GIL, so pages are OCRed concurrently
+                unique_images = list(unique_pages.values())
+                if self.early_stop_words > 0:
+                    unique_texts = self._extract_text_from_leading_pages(unique_images)
+                else:
+                    unique_texts = self._extract_text_from_pages(unique_images)
+                
+                # Pages left out by an early stop have no result and are omitted
+                unique_results = dict(zip(unique_pages.keys(), unique_texts))
+                page_results = [unique_results[key] for key in page_keys if key in unique_results]
+                
+                for image in images:
+                    image.close()
+            
             texts = []
             confidences = []
             
-            for i, image in enumerate(images):
-                text, confidence = self.extract_text_from_image(image)
+            for i, (text, confidence) in enumerate(page_results):
                 texts.append(text)
                 confidences.append(confidence)
                 logger.info(f"Extracted text from page {i+1}: {len(text)} characters with {confidence:.2f}% confidence")
             
-            extracted_text = ' '.join(texts)
+            extracted_text = '\n'.join(texts)
             avg_confidence = sum(confidences) / len(confidences) if confidences else 0.0
             logger.info(f"Total extracted text: {len(extracted_text)} characters with {avg_confidence:.2f}% confidence")
             return extracted_text, avg_confidence
@@ -89,15 +491,24 @@ class OCRService:
             logger.error(f"Error extracting text from PDF: {e}")
             raise
     
-    def process_file(self, file_content: bytes, file_extension: str) -> tuple[str, float]:
-        """Process file and extract text based on file type."""
+    def process_file(self, file_content: Union[bytes, str], file_extension: str) -> tuple[str, float]:
+        """
+        Process file and extract text based on file type.
+        
+        Args:
+            file_content: File content, or path of the file
+            file_extension: File extension deciding between PDF and image handling
+            
+        Returns:
+            Tuple of (extracted text, average confidence)
+        """
         try:
             if file_extension.lower() == 'pdf':
                 return self.extract_text_from_pdf(file_content)
             else:
                 # Handle image files
-                from io import BytesIO
-                image = Image.open(BytesIO(file_content))
+                image = Image.open(file_content if isinstance(file_content, str) else BytesIO(file_content))
+                self._draft_grayscale(image)
                 return self.extract_text_from_image(image)
                 
         except Exception as e:
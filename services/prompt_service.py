@@ -1,13 +1,27 @@
 """
 Prompt service for managing LLM prompt templates and formatting.
 """
-from typing import Dict, Any
+from typing import Dict, Any, List
+import hashlib
 import logging
+import re
 
-from config.prompts import CERTIFICATE_EXTRACTION_PROMPT, ACTIVITY_CATEGORIZATION_PROMPT
+from config.prompts import (
+    CERTIFICATE_EXTRACTION_SYSTEM_PROMPT,
+    CERTIFICATE_EXTRACTION_PROMPT,
+    CERTIFICATE_BATCH_EXTRACTION_SYSTEM_PROMPT,
+    CERTIFICATE_BATCH_EXTRACTION_PROMPT,
+    CERTIFICATE_COMBINED_SYSTEM_PROMPT,
+    ACTIVITY_CATEGORIZATION_SYSTEM_PROMPT,
+    ACTIVITY_CATEGORIZATION_PROMPT
+)
 
 logger = logging.getLogger(__name__)
 
+# OCR artifacts carrying no certificate content: registered/copyright marks, stray
+# table rules and underlines, footnote-like numbers in parentheses such as "(68)"
+_OCR_ARTIFACT_RE = re.compile(r'[®©™@|_~]+|\(\d{1,2}\)')
+
 
 class PromptService:
     """Service for managing and formatting LLM prompt templates."""
@@ -16,8 +30,19 @@ class PromptService:
         """Initialize prompt service."""
         self.prompts = {
             'certificate_extraction': CERTIFICATE_EXTRACTION_PROMPT,
+            'certificate_batch_extraction': CERTIFICATE_BATCH_EXTRACTION_PROMPT,
+            'certificate_combined': CERTIFICATE_EXTRACTION_PROMPT,
             'activity_categorization': ACTIVITY_CATEGORIZATION_PROMPT
         }
+        # Static instructions sent apart from the formatted prompt, as a cacheable prefix
+        self.system_prompts = {
+            'certificate_extraction': CERTIFICATE_EXTRACTION_SYSTEM_PROMPT,
+            'certificate_batch_extraction': CERTIFICATE_BATCH_EXTRACTION_SYSTEM_PROMPT,
+            'certificate_combined': CERTIFICATE_COMBINED_SYSTEM_PROMPT,
+            'activity_categorization': ACTIVITY_CATEGORIZATION_SYSTEM_PROMPT
+        }
+        # (categories_text, system prompt) last rendered; categories rarely change
+        self._categorization_system_prompt = (None, None)
     
     def get_prompt(self, prompt_type: str, **kwargs) -> str:
         """
@@ -46,6 +71,22 @@ class PromptService:
         except KeyError as e:
             raise ValueError(f"Missing required parameter for prompt '{prompt_type}': {e}")
     
+    @staticmethod
+    def preclean_ocr(text: str) -> str:
+        """
+        Remove OCR artifacts and redundant whitespace before text is put in a prompt.
+        
+        Line breaks are kept, as they separate the certificate's statements.
+        
+        Args:
+            text: OCR extracted text
+            
+        Returns:
+            Text without artifacts, runs of spaces or blank lines
+        """
+        lines = (' '.join(line.split()) for line in _OCR_ARTIFACT_RE.sub(' ', text).splitlines())
+        return '\n'.join(line for line in lines if line)
+    
     def get_certificate_extraction_prompt(self, text: str) -> str:
         """
         Get formatted certificate extraction prompt.
@@ -58,6 +99,21 @@ class PromptService:
         """
         return self.get_prompt('certificate_extraction', text=text)
     
+    def get_certificate_batch_extraction_prompt(self, texts: List[str]) -> str:
+        """
+        Get formatted prompt extracting several certificates at once.
+        
+        Args:
+            texts: OCR extracted texts, one per certificate
+            
+        Returns:
+            Formatted batch extraction prompt
+        """
+        documents = '\n\n'.join(
+            f"---DOC {number}---\n{text}" for number, text in enumerate(texts, 1)
+        )
+        return self.get_prompt('certificate_batch_extraction', documents=documents, count=len(texts))
+    
     def get_activity_categorization_prompt(
         self, 
         raw_text: str,
@@ -65,8 +121,7 @@ class PromptService:
         evento: str,
         local: str,
         data: str,
-        carga_horaria: str,
-        categories_text: str
+        carga_horaria: str
     ) -> str:
         """
         Get formatted activity categorization prompt.
@@ -78,7 +133,6 @@ class PromptService:
             local: Location
             data: Date
             carga_horaria: Hours
-            categories_text: Formatted categories list
             
         Returns:
             Formatted activity categorization prompt
@@ -90,10 +144,70 @@ class PromptService:
             evento=evento,
             local=local,
             data=data,
-            carga_horaria=carga_horaria,
-            categories_text=categories_text
+            carga_horaria=carga_horaria
         )
     
+    def get_system_prompt(self, prompt_type: str) -> str:
+        """
+        Get the static system prompt of a prompt type.
+        
+        Args:
+            prompt_type: The type of prompt
+            
+        Returns:
+            System prompt, empty if the prompt type has none
+        """
+        return self.system_prompts.get(prompt_type, '')
+    
+    def get_activity_categorization_system_prompt(self, categories_text: str) -> str:
+        """
+        Get the activity categorization system prompt including the category list.
+        
+        Categories rarely change, so keeping them in the static prefix lets
+        Ollama reuse its KV cache for everything but the certificate itself.
+        The prompt is rendered again only when the categories text changes.
+        
+        Args:
+            categories_text: Formatted categories list
+            
+        Returns:
+            System prompt followed by the categories
+        """
+        rendered_for, system_prompt = self._categorization_system_prompt
+        if rendered_for != categories_text:
+            system_prompt = f"{self.get_system_prompt('activity_categorization')}\n\nCATEGORIES:\n{categories_text}"
+            self._categorization_system_prompt = (categories_text, system_prompt)
+        return system_prompt
+    
+    def get_certificate_combined_system_prompt(self, categories_text: str) -> str:
+        """
+        Get the system prompt extracting fields and categorizing in one request.
+        
+        Args:
+            categories_text: Formatted categories list
+            
+        Returns:
+            System prompt followed by the categories
+        """
+        return f"{self.get_system_prompt('certificate_combined')}\n\nCATEGORIES:\n{categories_text}"
+    
+    def get_prompt_version(self, prompt_type: str) -> str:
+        """
+        Get a short version identifier derived from a prompt's templates.
+        
+        Any edit to the template or its system prompt changes the version, so
+        results produced with an older prompt are never reused.
+        
+        Args:
+            prompt_type: The type of prompt
+            
+        Returns:
+            First 12 hex characters of the SHA-256 of the system prompt and template
+        """
+        digest = hashlib.sha256(self.get_system_prompt(prompt_type).encode('utf-8'))
+        digest.update(self.prompts[prompt_type].encode('utf-8'))
+        return digest.hexdigest()[:12]
+    
     def list_available_prompts(self) -> list:
         """List all available prompt types."""
         return list(self.prompts.keys())
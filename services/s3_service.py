@@ -4,12 +4,18 @@ S3 Service for handling file uploads to LocalStack S3.
 import boto3
 import hashlib
 import logging
-from typing import Optional, Dict, Any
+import os
+from io import BytesIO
+from typing import Optional, Dict, Any, BinaryIO, Tuple, Union
+from botocore.config import Config
 from botocore.exceptions import ClientError
 import config.settings as settings
 
 logger = logging.getLogger(__name__)
 
+# Bytes read at a time when hashing uploads
+CHECKSUM_CHUNK_SIZE = 1024 * 1024
+
 
 class S3Service:
     """Service for handling S3 operations with LocalStack."""
@@ -18,13 +24,23 @@ class S3Service:
         """Initialize S3 service with LocalStack configuration."""
         self.bucket_name = settings.S3_BUCKET_NAME
         
-        # Internal S3 client for operations (within Docker network)
+        # Internal S3 client for operations (within Docker network), shared by
+        # every request thread and consumer, so its pool is sized for all of them.
+        # TCP keepalive stops idle pooled connections from being dropped between
+        # uploads, which would cost a new handshake for the next download.
+        # Standard retry mode retries throttling, 5xx and connection errors with
+        # exponential backoff and jitter before a download is reported as failed
         self.s3_client = boto3.client(
             's3',
             endpoint_url=settings.AWS_ENDPOINT_URL,
             aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
             aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-            region_name=settings.AWS_DEFAULT_REGION
+            region_name=settings.AWS_DEFAULT_REGION,
+            config=Config(
+                max_pool_connections=settings.S3_MAX_POOL_CONNECTIONS,
+                tcp_keepalive=True,
+                retries={'mode': 'standard', 'max_attempts': settings.S3_MAX_ATTEMPTS}
+            )
         )
         
         # External S3 client for presigned URLs (accessible from host)
@@ -62,9 +78,28 @@ class S3Service:
         """Calculate SHA-256 checksum of file content."""
         return hashlib.sha256(file_content).hexdigest()
     
+    def calculate_stream_checksum(self, file_obj: BinaryIO) -> Tuple[str, int]:
+        """
+        Calculate SHA-256 checksum of a file object without reading it into memory.
+        
+        Args:
+            file_obj: Seekable binary file object, rewound afterwards
+            
+        Returns:
+            Tuple of (checksum, size in bytes)
+        """
+        digest = hashlib.sha256()
+        size = 0
+        file_obj.seek(0)
+        for chunk in iter(lambda: file_obj.read(CHECKSUM_CHUNK_SIZE), b''):
+            digest.update(chunk)
+            size += len(chunk)
+        file_obj.seek(0)
+        return digest.hexdigest(), size
+    
     def upload_file(
         self, 
-        file_content: bytes, 
+        file_content: Union[bytes, BinaryIO], 
         enrollment_number: str, 
         filename: str,
         checksum: Optional[str] = None
@@ -73,7 +108,7 @@ class S3Service:
         Upload file to S3 with enrollment-based path structure.
         
         Args:
-            file_content: File content as bytes
+            file_content: File content as bytes or a seekable binary file object
             enrollment_number: Student enrollment number
             filename: Original filename
             checksum: Pre-calculated checksum (optional)
@@ -81,24 +116,30 @@ class S3Service:
         Returns:
             Dict with upload details
         """
+        file_obj = BytesIO(file_content) if isinstance(file_content, bytes) else file_content
         if checksum is None:
-            checksum = self.calculate_checksum(file_content)
+            checksum, file_size = self.calculate_stream_checksum(file_obj)
+        else:
+            file_size = file_obj.seek(0, os.SEEK_END)
+            file_obj.seek(0)
         
         # Create S3 key with enrollment-based path
         file_extension = filename.split('.')[-1] if '.' in filename else 'pdf'
         s3_key = f"certificates/{enrollment_number}/{checksum}.{file_extension}"
         
         try:
-            # Upload file to S3
-            self.s3_client.put_object(
-                Bucket=self.bucket_name,
-                Key=s3_key,
-                Body=file_content,
-                ContentType=self._get_content_type(file_extension),
-                Metadata={
-                    'enrollment_number': enrollment_number,
-                    'original_filename': filename,
-                    'checksum': checksum
+            # Upload file to S3, streamed from the file object (multipart when large)
+            self.s3_client.upload_fileobj(
+                file_obj,
+                self.bucket_name,
+                s3_key,
+                ExtraArgs={
+                    'ContentType': self._get_content_type(file_extension),
+                    'Metadata': {
+                        'enrollment_number': enrollment_number,
+                        'original_filename': filename,
+                        'checksum': checksum
+                    }
                 }
             )
             
@@ -108,7 +149,7 @@ class S3Service:
                 'success': True,
                 's3_key': s3_key,
                 'checksum': checksum,
-                'file_size': len(file_content),
+                'file_size': file_size,
                 'bucket': self.bucket_name
             }
             
@@ -136,6 +177,25 @@ class S3Service:
             logger.error(f"Failed to download file from S3: {e}")
             return None
     
+    def download_to_file(self, s3_key: str, fileobj: BinaryIO) -> bool:
+        """
+        Stream a file from S3 into a writable file object, without holding it in memory.
+        
+        Args:
+            s3_key: S3 object key
+            fileobj: Binary file object to write the content to
+            
+        Returns:
+            True if downloaded successfully, False otherwise
+        """
+        try:
+            self.s3_client.download_fileobj(self.bucket_name, s3_key, fileobj)
+            fileobj.flush()
+            return True
+        except ClientError as e:
+            logger.error(f"Failed to download file from S3: {e}")
+            return False
+    
     def file_exists(self, s3_key: str) -> bool:
         """Check if file exists in S3."""
         try:
@@ -0,0 +1,33 @@
+"""
+Tests for quantity extraction in the activity categorization service.
+"""
+import unittest
+
+from services.activity_categorization_service import ActivityCategorizationService
+
+
+class QuantityExtractionTest(unittest.TestCase):
+    """Unit spellings are tried in order of preference, not by position in the text."""
+
+    def setUp(self):
+        self.service = ActivityCategorizationService(None, None, None, None)
+
+    def test_days_prefers_portuguese_unit(self):
+        extracted_data = {'evento': 'Workshop (2 days) com 3 dias de atividades'}
+        self.assertEqual(self.service._extract_days_from_data(extracted_data), 3)
+
+    def test_pages_prefers_full_unit_over_abbreviation(self):
+        extracted_data = {'evento': 'Artigo, p. 15 p. de um total de 10 páginas'}
+        self.assertEqual(self.service._extract_pages_from_data(extracted_data), 10)
+
+    def test_pages_falls_back_to_abbreviation(self):
+        extracted_data = {'evento': 'Resumo publicado nos anais, 4 pgs'}
+        self.assertEqual(self.service._extract_pages_from_data(extracted_data), 4)
+
+    def test_no_quantity(self):
+        self.assertIsNone(self.service._extract_days_from_data({'evento': 'Palestra'}))
+        self.assertIsNone(self.service._extract_pages_from_data({'evento': 'Palestra'}))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+"""
+Tests for participant name matching in the certificate OCR consumer.
+"""
+import unittest
+
+from consumers import certificate_ocr_consumer
+from consumers.certificate_ocr_consumer import _names_match
+
+
+class NamesMatchTest(unittest.TestCase):
+    """Participant names must identify the student, not just share a word with them."""
+
+    def test_same_name_after_normalization(self):
+        self.assertTrue(_names_match('JOÃO DA SILVA', 'João da Silva'))
+
+    def test_shorter_form_of_full_name(self):
+        self.assertTrue(_names_match('João Silva', 'João da Silva Santos'))
+        self.assertTrue(_names_match('Maria S. Souza', 'Maria Souza'))
+
+    def test_surname_only_is_rejected(self):
+        self.assertFalse(_names_match('Silva', 'João Silva'))
+
+    def test_first_name_only_is_rejected(self):
+        self.assertFalse(_names_match('Ana', 'Ana Beatriz Rocha'))
+
+    def test_near_first_name_is_rejected(self):
+        self.assertFalse(_names_match('João Silva', 'Joana Silva'))
+
+    def test_shared_surname_is_rejected(self):
+        self.assertFalse(_names_match('Pedro Alves', 'Paulo Alves'))
+
+    def test_connectives_do_not_count_as_shared_words(self):
+        self.assertFalse(_names_match('Ana da Silva', 'Maria da Silva'))
+
+    @unittest.skipIf(certificate_ocr_consumer.fuzz is None, "rapidfuzz not installed")
+    def test_ocr_typo_in_a_word_is_tolerated(self):
+        self.assertTrue(_names_match('Joao Silv4', 'João Silva'))
+
+
+if __name__ == '__main__':
+    unittest.main()